@@ -20,8 +20,9 @@ except ImportError:
 
 from vkbottle.bot import Bot
 
-from cache import init_cache
+from cache import get_cache, init_cache
 from config import CACHE_TTL, VK_TOKEN
+from google_sheets import close_google_sheets
 from handlers.admin import Admin
 from handlers.user import User
 from notifications import notification_loop
@@ -50,7 +51,12 @@ async def main():
     Главная функция для запуска бота.
     Запускает параллельно обработку сообщений и цикл уведомлений.
     """
-    await asyncio.gather(bot.run_polling(), notification_loop(bot))
+    try:
+        await admin.preload_admin_names(bot.api)
+        await asyncio.gather(bot.run_polling(), notification_loop(bot))
+    finally:
+        await close_google_sheets()
+        await get_cache().close()
 
 
 if __name__ == "__main__":
@@ -1,22 +1,45 @@
 """
 Модуль кеширования данных из Google Sheets.
 Обеспечивает async-safe кеширование с автоматической инвалидацией при изменениях.
-Использует asyncio.Lock для асинхронных операций с Google Sheets API.
+Все операции с кешем выполняются в одном event loop и не содержат await
+внутри изменений словаря, поэтому они атомарны и не требуют блокировок.
 Реализует single-flight pattern для предотвращения cache stampede.
 """
 import asyncio
 import logging
+import sys
 import time
-from datetime import datetime
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import compress
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
-from config import DATETIME_FORMAT
+from config import ACTIVE_STATUSES
 
 logger = logging.getLogger(__name__)
 
+# Интернированные названия колонок: при совпадении объекта ключа
+# поиск в словаре записи обходится без посимвольного сравнения строк
+_K_DATE = sys.intern("Дата")
+_K_TIME = sys.intern("Время")
+_K_USER = sys.intern("Пользователь_ID")
+_K_STATUS = sys.intern("Статус")
+_K_WASH = sys.intern("Опция стирки")
+# Колонки с часто повторяющимися значениями, которые интернируются при загрузке
+_INTERNED_KEYS = (_K_STATUS, _K_USER, _K_WASH)
+
 
 class CacheEntry:
-    """Запись в кеше с данными и временем создания."""
+    """
+    Запись в кеше с данными и временем истечения.
+    Хранит также производные представления данных (views), например
+    отфильтрованные и отсортированные списки. Они живут ровно столько же,
+    сколько и сама запись, поэтому инвалидация записи сбрасывает и их.
+    """
+
+    # Сколько секунд после неудачной загрузки отдавать устаревшие данные
+    # без повторного обращения к loader
+    FAILURE_COOLDOWN = 10.0
 
     def __init__(self, data: Any, ttl: Optional[float] = None):
         """
@@ -27,8 +50,11 @@ class CacheEntry:
             ttl: Время жизни кеша в секундах (None = без ограничения)
         """
         self.data = data
-        self.created_at = time.time()
-        self.ttl = ttl
+        # time.monotonic не зависит от перевода системных часов (NTP и т.п.)
+        self.expires_at = time.monotonic() + ttl if ttl is not None else None
+        self.views: Dict[tuple, Any] = {}
+        # Время (time.monotonic) последней неудачной попытки обновить запись
+        self.last_failure_at: Optional[float] = None
 
     def is_expired(self) -> bool:
         """
@@ -37,15 +63,14 @@ class CacheEntry:
         Returns:
             True, если кеш истек, иначе False
         """
-        if self.ttl is None:
-            return False
-        return time.time() - self.created_at > self.ttl
+        return self.expires_at is not None and time.monotonic() > self.expires_at
 
 
 class Cache:
     """
     Async-safe кеш для данных из Google Sheets.
-    Использует asyncio.Lock для обеспечения безопасности при одновременном доступе.
+    Чтение и запись идут без блокировок: между проверкой и изменением
+    словаря нет точек переключения корутин.
     Реализует single-flight pattern: если несколько корутин запрашивают один ключ,
     только одна загружает данные, остальные ждут результата.
     """
@@ -58,9 +83,17 @@ class Cache:
             default_ttl: Время жизни кеша по умолчанию в секундах (5 минут)
         """
         self._cache: Dict[str, CacheEntry] = {}
-        self._lock = asyncio.Lock()
-        # Словарь для отслеживания текущих загрузок (single-flight pattern)
-        self._pending: Dict[str, asyncio.Task] = {}
+        # Future текущих загрузок по ключам (single-flight pattern)
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Собственный пул потоков для sync loader'ов, чтобы загрузка из
+        # Google Sheets не ждала в общей очереди других run_in_executor в боте
+        self._loader_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="gsheet-loader"
+        )
+        # Результат asyncio.iscoroutinefunction для loader'ов, вычисляется
+        # один раз. Ключ - объект кода функции: loader'ы создаются как
+        # замыкания на каждый вызов, а код у всех таких замыканий общий.
+        self._loader_is_coro: Dict[Any, bool] = {}
         self.default_ttl = default_ttl
 
     async def get(
@@ -68,80 +101,110 @@ class Cache:
         key: str,
         loader: Optional[Callable[[], Any]] = None,
         ttl: Optional[float] = None,
+        transform: Optional[Callable[[Any], Any]] = None,
     ) -> Any:
         """
         Получает данные из кеша или загружает их через loader.
-        Реализует double-checked locking для предотвращения cache stampede.
+        Single-flight: при промахе первая корутина (лидер) регистрирует Future
+        и выполняет загрузку, остальные просто ждут этот Future.
 
         Args:
             key: Ключ кеша
             loader: Функция для загрузки данных (может быть sync или async)
             ttl: Время жизни кеша (если не указано, используется default_ttl)
+            transform: Функция обработки загруженных данных перед сохранением
+                (например, построение индексов); выполняется один раз на загрузку
 
         Returns:
             Закешированные или загруженные данные
         """
-        # Первая проверка (без блокировки, быстрая)
+        # Чтение без блокировки: dict.get по одному ключу атомарен
         entry = self._cache.get(key)
         if entry and not entry.is_expired():
             return entry.data
 
-        # Если loader не передан, возвращаем что есть
+        # Без loader'а обновить запись нечем: истекшие данные не отдаем,
+        # устаревшее значение допустимо только через механизм ниже (SWR)
         if loader is None:
-            return entry.data if entry else None
+            return None
+
+        # Stale-while-revalidate: недавно обновление не удалось - не дергаем
+        # источник повторно, а отдаем устаревшие данные до конца паузы
+        if (
+            entry
+            and entry.last_failure_at is not None
+            and time.monotonic() - entry.last_failure_at < CacheEntry.FAILURE_COOLDOWN
+        ):
+            return entry.data
 
-        # Проверяем, не загружается ли уже этот ключ другой корутиной
-        async with self._lock:
-            # Вторая проверка (под блокировкой)
-            entry = self._cache.get(key)
-            if entry and not entry.is_expired():
-                return entry.data
+        # Между проверкой и регистрацией Future нет await, поэтому в event loop
+        # этот участок атомарен и не требует блокировки
+        future = self._pending.get(key)
+        is_leader = future is None
+        if is_leader:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
 
-            # Проверяем pending загрузки
-            if key in self._pending:
-                # Другая корутина уже загружает данные, ждем результата
-                pending_task = self._pending[key]
-                # Освобождаем lock, чтобы не блокировать других
-                pass  # lock освободится при выходе из блока
-
-        # Если есть pending задача, ждем ее завершения
-        if key in self._pending:
-            try:
-                await self._pending[key]
-            except Exception:
-                pass  # Ошибка будет обработана в загружающей корутине
-            # После завершения pending задачи данные должны быть в кеше
-            entry = self._cache.get(key)
-            if entry and not entry.is_expired():
-                return entry.data
-            # Если данных все еще нет, пробуем загрузить сами
-            if entry:
-                return entry.data
+        if not is_leader:
+            # shield: отмена ожидающей корутины не должна отменять общий Future
+            return await asyncio.shield(future)
 
-        # Создаем задачу загрузки
-        async with self._lock:
-            # Тройная проверка - возможно, пока мы ждали lock, кто-то уже загрузил
-            entry = self._cache.get(key)
-            if entry and not entry.is_expired():
-                return entry.data
+        try:
+            data = await self._load_and_cache(key, loader, ttl, transform)
+        except asyncio.CancelledError:
+            self._release_pending(key, future)
+            future.cancel()
+            raise
+        except Exception as e:
+            self._release_pending(key, future)
+            future.set_exception(e)
+            # Помечаем исключение как полученное, если ожидающих не было
+            future.exception()
+            raise
 
-            # Создаем задачу загрузки и добавляем в pending
-            load_task = asyncio.create_task(self._load_and_cache(key, loader, ttl))
-            self._pending[key] = load_task
+        # При успешной загрузке ключ уже снят с pending в _load_and_cache,
+        # здесь остается случай возврата устаревших данных после ошибки
+        self._release_pending(key, future)
+        future.set_result(data)
+        return data
 
-        # Выполняем загрузку
-        try:
-            return await load_task
-        finally:
-            # Удаляем из pending после завершения
-            async with self._lock:
-                self._pending.pop(key, None)
+    def set(
+        self,
+        key: str,
+        data: Any,
+        ttl: Optional[float] = None,
+        transform: Optional[Callable[[Any], Any]] = None,
+    ) -> Any:
+        """
+        Кладет в кеш уже загруженные данные (например, полученные попутно
+        при загрузке другого ключа).
+
+        Args:
+            key: Ключ кеша
+            data: Данные для кеширования
+            ttl: Время жизни кеша (если не указано, используется default_ttl)
+            transform: Функция обработки данных перед сохранением
+
+        Returns:
+            Сохраненные (и обработанные transform) данные
+        """
+        if transform is not None:
+            data = transform(data)
+        ttl_to_use = ttl if ttl is not None else self.default_ttl
+        self._cache[key] = CacheEntry(data, ttl_to_use)
+        return data
+
+    def _release_pending(self, key: str, future: asyncio.Future) -> None:
+        """Снимает ключ с pending, только если там зарегистрирован этот Future."""
+        if self._pending.get(key) is future:
+            del self._pending[key]
 
     async def _load_and_cache(
         self,
         key: str,
         loader: Callable[[], Any],
         ttl: Optional[float],
+        transform: Optional[Callable[[Any], Any]] = None,
     ) -> Any:
         """
         Внутренний метод для загрузки и кеширования данных.
@@ -150,35 +213,66 @@ class Cache:
             key: Ключ кеша
             loader: Функция загрузки (sync или async)
             ttl: Время жизни кеша
+            transform: Функция обработки загруженных данных перед сохранением
 
         Returns:
-            Загруженные данные
+            Загруженные (и обработанные transform) данные
         """
         # Выполняем loader (может быть sync или async)
         try:
-            # Проверяем, является ли loader корутиной
-            if asyncio.iscoroutinefunction(loader):
+            if self._is_coroutine_loader(loader):
                 data = await loader()
             else:
                 # Sync функция - выполняем в executor, чтобы не блокировать event loop
-                data = await asyncio.get_event_loop().run_in_executor(None, loader)
+                data = await asyncio.get_running_loop().run_in_executor(
+                    self._loader_executor, loader
+                )
         except Exception as e:
             logger.error(f"Ошибка загрузки данных для ключа {key}: {e}")
             # Пробуем вернуть старые данные как fallback
             entry = self._cache.get(key)
             if entry:
                 logger.warning(f"Используем устаревшие данные для ключа {key}")
+                entry.last_failure_at = time.monotonic()
                 return entry.data
             raise
 
-        # Сохраняем результат в кеш под lock
-        async with self._lock:
-            ttl_to_use = ttl if ttl is not None else self.default_ttl
-            self._cache[key] = CacheEntry(data, ttl_to_use)
-            logger.debug(f"Данные закешированы для ключа {key} с TTL={ttl_to_use}с")
+        if transform is not None:
+            data = transform(data)
+
+        # Сохраняем результат в кеш и снимаем ключ с pending
+        ttl_to_use = ttl if ttl is not None else self.default_ttl
+        self._cache[key] = CacheEntry(data, ttl_to_use)
+        self._pending.pop(key, None)
+        logger.debug(f"Данные закешированы для ключа {key} с TTL={ttl_to_use}с")
 
         return data
 
+    def _is_coroutine_loader(self, loader: Callable[[], Any]) -> bool:
+        """
+        Определяет, является ли loader корутинной функцией, с запоминанием результата.
+
+        Args:
+            loader: Функция загрузки
+
+        Returns:
+            True для async-функции, False для sync
+        """
+        code = getattr(loader, "__code__", None)
+        if code is None:
+            return asyncio.iscoroutinefunction(loader)
+        is_coro = self._loader_is_coro.get(code)
+        if is_coro is None:
+            is_coro = asyncio.iscoroutinefunction(loader)
+            self._loader_is_coro[code] = is_coro
+        return is_coro
+
+    async def close(self) -> None:
+        """Останавливает пул потоков loader'ов. Вызывается при завершении бота."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._loader_executor.shutdown
+        )
+
     async def invalidate(self, key: Optional[str] = None) -> None:
         """
         Инвалидирует кеш (удаляет запись или все записи).
@@ -186,57 +280,56 @@ class Cache:
         Args:
             key: Ключ для удаления (None = удалить все)
         """
-        async with self._lock:
-            if key is None:
-                self._cache.clear()
-                logger.debug("Весь кеш очищен")
-            else:
-                if key in self._cache:
-                    del self._cache[key]
-                    logger.debug(f"Кеш инвалидирован для ключа: {key}")
+        if key is None:
+            self._cache.clear()
+            logger.debug("Весь кеш очищен")
+        elif self._cache.pop(key, None) is not None:
+            logger.debug(f"Кеш инвалидирован для ключа: {key}")
 
     async def invalidate_pattern(self, pattern: str) -> None:
         """
         Инвалидирует все ключи, начинающиеся с указанного паттерна.
+        Поиск ключей идет по снимку словаря.
 
         Args:
             pattern: Паттерн для поиска ключей
         """
-        async with self._lock:
-            keys_to_remove = [key for key in self._cache.keys() if key.startswith(pattern)]
-            for key in keys_to_remove:
-                del self._cache[key]
-            if keys_to_remove:
-                logger.debug(f"Инвалидировано {len(keys_to_remove)} ключей с паттерном: {pattern}")
+        snapshot = list(self._cache.keys())
+        keys_to_remove = [key for key in snapshot if key.startswith(pattern)]
+        if not keys_to_remove:
+            return
+        for key in keys_to_remove:
+            self._cache.pop(key, None)
+        logger.debug(f"Инвалидировано {len(keys_to_remove)} ключей с паттерном: {pattern}")
 
     async def clear_expired(self) -> None:
         """Удаляет все истекшие записи из кеша."""
-        async with self._lock:
-            expired_keys = [
-                key for key, entry in self._cache.items() if entry.is_expired()
-            ]
-            for key in expired_keys:
-                del self._cache[key]
-            if expired_keys:
-                logger.debug(f"Удалено {len(expired_keys)} истекших записей из кеша")
+        snapshot = list(self._cache.items())
+        expired_keys = [key for key, entry in snapshot if entry.is_expired()]
+        if not expired_keys:
+            return
+        for key in expired_keys:
+            del self._cache[key]
+        logger.debug(f"Удалено {len(expired_keys)} истекших записей из кеша")
 
     async def get_stats(self) -> Dict[str, Any]:
         """
         Возвращает статистику кеша.
+        Считается по снимку словаря.
 
         Returns:
             Словарь со статистикой кеша
         """
-        async with self._lock:
-            total = len(self._cache)
-            expired = sum(1 for entry in self._cache.values() if entry.is_expired())
-            pending = len(self._pending)
-            return {
-                "total_entries": total,
-                "expired_entries": expired,
-                "valid_entries": total - expired,
-                "pending_loads": pending,
-            }
+        entries = list(self._cache.values())
+        total = len(entries)
+        expired = sum(1 for entry in entries if entry.is_expired())
+        pending = len(self._pending)
+        return {
+            "total_entries": total,
+            "expired_entries": expired,
+            "valid_entries": total - expired,
+            "pending_loads": pending,
+        }
 
 
 # Глобальный экземпляр кеша
@@ -302,6 +395,105 @@ def get_cache_key_bookings(
     return ":".join(parts)
 
 
+def _booking_sort_key(record: Dict[str, str]) -> Tuple[str, str, str, str]:
+    """
+    Ключ сортировки бронирований по дате и времени.
+    Дата хранится как "дд.мм.гг", время как "ЧЧ:ММ" (с ведущими нулями),
+    поэтому кортеж (год, месяц, день, время) сравнивается лексикографически
+    в хронологическом порядке без вызова datetime.strptime.
+    Пробелы по краям уже убраны при загрузке (_index_bookings).
+
+    Args:
+        record: Запись бронирования
+
+    Returns:
+        Кортеж строк (год, месяц, день, время)
+    """
+    d = record[_K_DATE]
+    t = record[_K_TIME]
+    return (d[6:8], d[3:5], d[0:2], t)
+
+
+class BookingIndex(NamedTuple):
+    """Бронирования с индексами, построенными один раз при загрузке в кеш."""
+
+    # Все записи, отсортированные по дате и времени
+    all: List[Dict[str, str]]
+    # Дата ("дд.мм.гг") -> записи за эту дату
+    by_date: Dict[str, List[Dict[str, str]]]
+    # ID пользователя (строка) -> записи пользователя
+    by_user: Dict[str, List[Dict[str, str]]]
+    # Статус -> записи с этим статусом
+    by_status: Dict[str, List[Dict[str, str]]]
+    # Дата -> время занятых слотов (записи с активными статусами)
+    active_slots: Dict[str, Set[str]]
+    # Колонка "Статус" отдельным списком, параллельным all: фильтр только
+    # по статусам идет по плотному списку строк, не трогая словари записей
+    statuses: List[str]
+
+
+def _index_bookings(records: List[Dict[str, str]]) -> BookingIndex:
+    """
+    Строит индексы бронирований один раз при загрузке в кеш.
+    Заодно убирает пробелы по краям даты и времени, интернирует часто
+    повторяющиеся значения (дата, время, статус, ID пользователя, опция стирки),
+    чтобы одинаковые строки всех записей были одним объектом, и один раз сортирует
+    записи по дате и времени: индексы заполняются в этом порядке, а фильтрация
+    его сохраняет, поэтому результаты запросов сортировать уже не нужно.
+
+    Args:
+        records: Все бронирования из таблицы
+
+    Returns:
+        BookingIndex; все списки в нем отсортированы
+    """
+    by_date: Dict[str, List[Dict[str, str]]] = {}
+    by_user: Dict[str, List[Dict[str, str]]] = {}
+    by_status: Dict[str, List[Dict[str, str]]] = {}
+    active_slots: Dict[str, Set[str]] = {}
+    intern = sys.intern
+    for record in records:
+        record[_K_DATE] = intern(record[_K_DATE].strip())
+        record[_K_TIME] = intern(record[_K_TIME].strip())
+        for key in _INTERNED_KEYS:
+            value = record.get(key)
+            if value is not None:
+                record[key] = intern(value)
+    # Строки в таблице обычно уже идут по порядку - Timsort тогда линеен
+    records.sort(key=_booking_sort_key)
+    for record in records:
+        by_date.setdefault(record.get(_K_DATE), []).append(record)
+        by_user.setdefault(record.get(_K_USER), []).append(record)
+        status = record.get(_K_STATUS)
+        by_status.setdefault(status, []).append(record)
+        if status in ACTIVE_STATUSES:
+            active_slots.setdefault(record[_K_DATE], set()).add(record[_K_TIME])
+    statuses = [record.get(_K_STATUS) for record in records]
+    return BookingIndex(records, by_date, by_user, by_status, active_slots, statuses)
+
+
+@lru_cache(maxsize=64)
+def _statuses_frozenset(statuses: Tuple[str, ...]) -> frozenset:
+    """Возвращает один и тот же frozenset для повторяющихся кортежей статусов."""
+    return frozenset(statuses)
+
+
+async def get_cached_booking_index(
+    loader: Callable[[], List[Dict[str, str]]],
+) -> Optional[BookingIndex]:
+    """
+    Получает индексированные бронирования из кеша или загружает их.
+
+    Args:
+        loader: Функция для загрузки всех бронирований
+
+    Returns:
+        BookingIndex или None, если данных нет
+    """
+    cache = get_cache()
+    return await cache.get(CACHE_KEY_BOOKINGS, loader, transform=_index_bookings)
+
+
 async def get_cached_bookings(
     loader: Callable[[], List[Dict[str, str]]],
     date: Optional[str] = None,
@@ -318,45 +510,212 @@ async def get_cached_bookings(
         statuses: Статусы для фильтрации
 
     Returns:
-        Список бронирований
+        Список бронирований; список общий для всех вызовов, изменять его нельзя
     """
-    # Сначала получаем все бронирования из кеша
+    # Сначала получаем индексированные бронирования из кеша
     cache = get_cache()
-    all_bookings = await cache.get(CACHE_KEY_BOOKINGS, loader)
+    indexed = await get_cached_booking_index(loader)
 
-    if all_bookings is None:
+    if indexed is None:
         return []
 
-    # Применяем фильтры
-    filtered = all_bookings
+    # Без фильтров отдаем общий отсортированный список как есть (только для чтения):
+    # ни прохода по записям, ни копии, ни отдельного представления в кеше
+    if not date and user_id is None and not statuses:
+        return indexed.all
+
+    # Результат фильтрации запоминается в записи кеша,
+    # поэтому повторный запрос с теми же фильтрами - это поиск в словаре
+    entry = cache._cache.get(CACHE_KEY_BOOKINGS)
+    if entry is not None and entry.data is not indexed:
+        entry = None
+    statuses_set = _statuses_frozenset(statuses) if statuses else None
+    view_key = (date, user_id, statuses_set)
+    if entry is not None:
+        view = entry.views.get(view_key)
+        if view is not None:
+            return view
+
+    # Берем наименьший набор кандидатов среди подходящих индексов,
+    # остальные фильтры применяем к нему за один проход
+    user_id_str = str(user_id) if user_id is not None else None
+    candidates = indexed.all
     if date:
-        filtered = [b for b in filtered if b.get("Дата") == date]
-    if user_id is not None:
-        user_id_str = str(user_id)
-        filtered = [b for b in filtered if b.get("Пользователь_ID") == user_id_str]
-    if statuses:
-        statuses_set = set(statuses)
-        filtered = [b for b in filtered if b.get("Статус") in statuses_set]
-
-    # Сортируем по дате и времени
-    filtered.sort(
-        key=lambda r: datetime.strptime(
-            r.get("Дата").strip() + " " + r.get("Время").strip(),
-            DATETIME_FORMAT,
-        )
-    )
+        candidates = indexed.by_date.get(date, [])
+    if user_id_str is not None:
+        by_user = indexed.by_user.get(user_id_str, [])
+        if len(by_user) < len(candidates):
+            candidates = by_user
+    if statuses_set is not None and len(statuses_set) == 1:
+        (status,) = statuses_set
+        by_status = indexed.by_status.get(status, [])
+        if len(by_status) < len(candidates):
+            candidates = by_status
+
+    if candidates is indexed.all and statuses_set is not None:
+        # Только фильтр по нескольким статусам: проход по колонке целиком в C
+        filtered = list(compress(indexed.all, map(statuses_set.__contains__, indexed.statuses)))
+    else:
+        filtered = [
+            b for b in candidates
+            if (not date or b.get(_K_DATE) == date)
+            and (user_id_str is None or b.get(_K_USER) == user_id_str)
+            and (statuses_set is None or b.get(_K_STATUS) in statuses_set)
+        ]
+
+    if entry is not None:
+        entry.views[view_key] = filtered
 
     return filtered
 
 
+# Обработчики, вызываемые после инвалидации кеша бронирований
+_bookings_listeners: List[Callable[[], None]] = []
+# Счетчик изменений кеша бронирований (инвалидаций и записей apply_booking_*):
+# по нему загрузка, начатая до изменения, узнает, что ее снимок устарел
+_bookings_version = 0
+
+
+def bookings_version() -> int:
+    """Текущее значение счетчика изменений кеша бронирований."""
+    return _bookings_version
+
+
+def add_bookings_listener(callback: Callable[[], None]) -> None:
+    """
+    Регистрирует обработчик, вызываемый после каждой инвалидации кеша бронирований.
+    Используется, например, циклом уведомлений, чтобы пересобрать расписание.
+
+    Args:
+        callback: Синхронная функция без аргументов
+    """
+    _bookings_listeners.append(callback)
+
+
 async def invalidate_bookings_cache() -> None:
-    """Инвалидирует кеш бронирований."""
+    """Инвалидирует кеш бронирований (CACHE_KEY_BOOKINGS тоже начинается с "bookings:")."""
+    global _bookings_version
+    _bookings_version += 1
     cache = get_cache()
-    await cache.invalidate(CACHE_KEY_BOOKINGS)
     await cache.invalidate_pattern("bookings:")
+    for callback in _bookings_listeners:
+        callback()
+
+
+async def _apply_to_bookings(mutate: Callable[[List[Dict[str, str]]], None]) -> None:
+    """
+    Применяет изменение к закешированным бронированиям без обращения к таблице.
+    Индексы строятся заново по измененной копии списка (без сети, список уже
+    почти отсортирован), поэтому ранее выданные списки не меняют состав.
+    Сами записи-словари при этом общие: изменения, которые mutate вносит
+    в них на месте (сдвиг "_row" в apply_booking_delete), видны всем, кто
+    их держит - спискам, контексту диалога, ожидающим вызовам.
+    Если в кеше нет актуальных данных или идет их загрузка (она могла начаться
+    до записи), кеш просто инвалидируется.
+
+    Args:
+        mutate: Функция, изменяющая копию списка всех бронирований
+    """
+    cache = get_cache()
+    entry = cache._cache.get(CACHE_KEY_BOOKINGS)
+    if entry is None or entry.is_expired() or CACHE_KEY_BOOKINGS in cache._pending:
+        await invalidate_bookings_cache()
+        return
+    global _bookings_version
+    _bookings_version += 1
+    records = list(entry.data.all)
+    mutate(records)
+    entry.data = _index_bookings(records)
+    entry.views.clear()
+    for callback in _bookings_listeners:
+        callback()
+
+
+async def apply_booking_insert(record: Dict[str, str]) -> None:
+    """
+    Добавляет в кеш бронирование, только что записанное в таблицу.
+
+    Args:
+        record: Запись бронирования с полем "_row"
+    """
+    await _apply_to_bookings(lambda records: records.append(record))
 
 
-async def get_cached_blacklist(loader: Callable[[], List[str]]) -> List[str]:
+async def apply_booking_update(record: Dict[str, str]) -> None:
+    """
+    Заменяет в кеше бронирование с тем же номером строки на обновленное.
+
+    Args:
+        record: Обновленная запись бронирования с полем "_row"
+    """
+    row = record["_row"]
+
+    def mutate(records: List[Dict[str, str]]) -> None:
+        for i, existing in enumerate(records):
+            if existing.get("_row") == row:
+                records[i] = record
+                return
+        records.append(record)
+
+    await _apply_to_bookings(mutate)
+
+
+async def apply_booking_delete(row: int) -> None:
+    """
+    Удаляет из кеша бронирование, строка которого удалена из таблицы.
+    Строки ниже удаленной в таблице сдвигаются вверх, поэтому их "_row"
+    уменьшается на единицу. Сдвиг делается в тех же словарях намеренно:
+    записи, сохраненные в контексте диалога или ранее выданных списках,
+    продолжают указывать на свою настоящую строку, и последующие
+    update_booking/delete_booking по ним не попадут в чужую строку.
+
+    Args:
+        row: Номер удаленной строки
+    """
+
+    def mutate(records: List[Dict[str, str]]) -> None:
+        records[:] = [record for record in records if record.get("_row") != row]
+        for record in records:
+            if record["_row"] > row:
+                record["_row"] -= 1
+
+    await _apply_to_bookings(mutate)
+
+
+def prime_sheet_caches(
+    bookings: Optional[List[Dict[str, str]]] = None,
+    blacklist: Optional[Dict[str, int]] = None,
+    schedule: Optional[Dict[int, Tuple[int, int]]] = None,
+) -> None:
+    """
+    Заполняет кеши листов данными, прочитанными одним пакетным запросом.
+    Переданные значения None пропускаются. Актуальные записи кеша не
+    заменяются: бронирования в них могли быть изменены записью (apply_booking_*)
+    уже после того, как пакетный запрос прочитал лист, и снимок их бы затер.
+    Чтобы заменить актуальные данные, кеш нужно сначала инвалидировать.
+
+    Args:
+        bookings: Все бронирования
+        blacklist: Черный список: ссылка -> номер строки
+        schedule: Расписание: индекс дня недели -> (час начала, час окончания)
+    """
+    cache = get_cache()
+
+    def needs_prime(key: str) -> bool:
+        entry = cache._cache.get(key)
+        return entry is None or entry.is_expired()
+
+    if bookings is not None and needs_prime(CACHE_KEY_BOOKINGS):
+        cache.set(CACHE_KEY_BOOKINGS, bookings, transform=_index_bookings)
+    if blacklist is not None and needs_prime(CACHE_KEY_BLACKLIST):
+        cache.set(CACHE_KEY_BLACKLIST, blacklist)
+    if schedule is not None and needs_prime(CACHE_KEY_SCHEDULE):
+        cache.set(CACHE_KEY_SCHEDULE, schedule)
+
+
+async def get_cached_blacklist(
+    loader: Callable[[], Dict[str, int]]
+) -> Dict[str, int]:
     """
     Получает черный список из кеша или загружает его.
 
@@ -364,11 +723,37 @@ async def get_cached_blacklist(loader: Callable[[], List[str]]) -> List[str]:
         loader: Функция для загрузки черного списка
 
     Returns:
-        Список ссылок из черного списка
+        Словарь ссылка -> номер строки в листе
     """
     cache = get_cache()
     result = await cache.get(CACHE_KEY_BLACKLIST, loader)
-    return result or []
+    return result or {}
+
+
+async def get_cached_blacklist_links(
+    loader: Callable[[], Dict[str, int]]
+) -> Set[str]:
+    """
+    Получает множество ссылок черного списка для проверки принадлежности.
+    Множество строится один раз на загрузку и хранится в записи кеша,
+    поэтому живет до ее инвалидации.
+
+    Args:
+        loader: Функция для загрузки черного списка
+
+    Returns:
+        Множество ссылок из черного списка
+    """
+    cache = get_cache()
+    entries = await get_cached_blacklist(loader)
+    entry = cache._cache.get(CACHE_KEY_BLACKLIST)
+    if entry is None or entry.data is not entries:
+        return set(entries)
+    links = entry.views.get(("links",))
+    if links is None:
+        links = set(entries)
+        entry.views[("links",)] = links
+    return links
 
 
 async def invalidate_blacklist_cache() -> None:
@@ -377,19 +762,21 @@ async def invalidate_blacklist_cache() -> None:
     await cache.invalidate(CACHE_KEY_BLACKLIST)
 
 
-async def get_cached_schedule(loader: Callable[[], List[Dict[str, str]]]) -> List[Dict[str, str]]:
+async def get_cached_schedule(
+    loader: Callable[[], Dict[int, Tuple[int, int]]]
+) -> Dict[int, Tuple[int, int]]:
     """
     Получает расписание из кеша или загружает его.
 
     Args:
-        loader: Функция для загрузки расписания
+        loader: Функция для загрузки разобранного расписания
 
     Returns:
-        Список записей расписания
+        Словарь: индекс дня недели -> (час начала, час окончания)
     """
     cache = get_cache()
     result = await cache.get(CACHE_KEY_SCHEDULE, loader)
-    return result or []
+    return result or {}
 
 
 async def invalidate_schedule_cache() -> None:
@@ -3,7 +3,9 @@
 Загружает настройки из переменных окружения и предоставляет константы для использования в других модулях.
 """
 import os
-from datetime import date, datetime
+import sys
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -21,17 +23,20 @@ load_dotenv(BASE_DIR / ".env")
 VK_TOKEN = os.getenv("VK_TOKEN")
 SPREADSHEET_NAME = os.getenv("SPREADSHEET_NAME", "test_vk_bot")
 
-ADMIN_IDS = [
+# Кортеж сохраняет порядок из .env (первый админ - контакт по умолчанию),
+# frozenset используется для проверки "является ли пользователь админом"
+ADMIN_IDS_TUPLE = tuple(
     int(admin_id)
     for admin_id in os.getenv("ADMIN_IDS").split(",")
     if admin_id.strip()
-]
+)
+ADMIN_IDS = frozenset(ADMIN_IDS_TUPLE)
 
 _admin_contact_env = os.getenv("ADMIN_CONTACT_URL", "").strip()
 if _admin_contact_env:
     ADMIN_CONTACT_URL = _admin_contact_env
 elif ADMIN_IDS:
-    ADMIN_CONTACT_URL = f"https://vk.com/id{ADMIN_IDS[0]}"
+    ADMIN_CONTACT_URL = f"https://vk.com/id{ADMIN_IDS_TUPLE[0]}"
 else:
     ADMIN_CONTACT_URL = "https://vk.com"
 
@@ -43,12 +48,26 @@ NOTIFY_BEFORE_MIN = int(os.getenv("NOTIFY_BEFORE_MIN", "10"))
 NOTIFY_AFTER_MIN = int(os.getenv("NOTIFY_AFTER_MIN", "60"))
 
 
+# Часовой пояс прачечной: все даты и время записей - московские
+MOSCOW_TZ = timezone(timedelta(hours=3), name="МСК")
+
 WEEKDAYS_SHORT_RU = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
 DATE_FORMAT = "%d.%m.%y"
 TIME_FORMAT = "%H:%M"
 DATETIME_FORMAT = "%d.%m.%y %H:%M"
 
 
+# Статусы бронирований (значения колонки "Статус"). Интернированы, как и
+# статусы записей в кеше, поэтому сравнение с ними - сравнение указателей
+STATUS_PENDING = sys.intern("На подтверждении")
+STATUS_CONFIRMED = sys.intern("Подтвержден")
+STATUS_REJECTED = sys.intern("Отказан")
+STATUS_BLOCKED = sys.intern("Заблокировано администратором")
+
+# Статусы, при которых слот считается занятым
+ACTIVE_STATUSES = frozenset({STATUS_PENDING, STATUS_CONFIRMED, STATUS_BLOCKED})
+
+
 WASH_OPTIONS = ["Без добавок", "Отбеливатель", "Порошок", "Кондиционер", "Гель"]
 WASH_PRICES = {"Без добавок": 90, "Отбеливатель": 20, "Порошок": 15, "Кондиционер": 20, "Гель": 20} 
 
@@ -56,18 +75,46 @@ WASH_PRICES = {"Без добавок": 90, "Отбеливатель": 20, "П
 CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))  # 5 минут по умолчанию
 # Интервал проверки изменений в Google Sheets (в секундах)
 SHEET_CHECK_INTERVAL = int(os.getenv("SHEET_CHECK_INTERVAL", "60"))  # 1 минута по умолчанию
-
-
+# Время жизни диалогового контекста пользователя (в секундах) и его предельный размер
+CONTEXT_TTL = int(os.getenv("CONTEXT_TTL", "1800"))  # 30 минут по умолчанию
+CONTEXT_MAXSIZE = int(os.getenv("CONTEXT_MAXSIZE", "10000"))
+
+
+@lru_cache(maxsize=512)
+def parse_date(value: str) -> date:
+    """
+    Разбирает дату записи в формате DATE_FORMAT ("дд.мм.гг").
+    Для строк с ведущими нулями цифры берутся по фиксированным позициям
+    без datetime.strptime; остальные разбираются strptime, как и раньше
+    (при неверном формате поднимается ValueError).
+    """
+    if len(value) == 8 and value[2] == "." and value[5] == ".":
+        return date(2000 + int(value[6:8]), int(value[3:5]), int(value[0:2]))
+    return datetime.strptime(value, DATE_FORMAT).date()
+
+
+def parse_time(value: str) -> time:
+    """
+    Разбирает время слота в формате TIME_FORMAT ("ЧЧ:ММ").
+    Строки вида "10:00" разбираются time.fromisoformat без strptime;
+    остальные - strptime, как и раньше (ValueError при неверном формате).
+    """
+    if len(value) == 5 and value[2] == ":":
+        return time.fromisoformat(value)
+    return datetime.strptime(value, TIME_FORMAT).time()
+
+
+# Одни и те же даты форматируются для каждой записи и страницы клавиатуры
+@lru_cache(maxsize=512)
 def format_date_with_weekday(d: date) -> str:
-    return f"{WEEKDAYS_SHORT_RU[d.weekday()]} - {d.strftime(DATE_FORMAT)}"
+    # Эквивалент d.strftime(DATE_FORMAT) без разбора формата на каждый вызов
+    return f"{WEEKDAYS_SHORT_RU[d.weekday()]} - {d.day:02d}.{d.month:02d}.{d.year % 100:02d}"
 
 def convert_from_format_with_weekday(value: str) -> Optional[date]:
     try:
         date_part = value.split("-")[1].strip()
-
-        return datetime.strptime(
-            date_part,
-            DATE_FORMAT,
-        ).date()
     except IndexError:
-        return None
\ No newline at end of file
+        return None
+
+    # При неверном формате, как и раньше, поднимается ValueError
+    return parse_date(date_part)
@@ -5,40 +5,78 @@
 """
 #https://docs.google.com/spreadsheets/d/1s9zB97Qxnp1YpoJMlB9wbRAk_b51D-9cDfBcsQvQu9g/edit?gid=0#gid=0
 import asyncio
-from datetime import datetime, timedelta, timezone
-import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+from operator import itemgetter
+import json
 import logging
+import os
+import random
 import re
-from typing import Dict, Iterable, List, Optional
+import sys
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypedDict
+from urllib.parse import quote
 
+import aiohttp
 import gspread
+from gspread.utils import rowcol_to_a1
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from requests.adapters import HTTPAdapter
 from vkbottle.api import API
 
 from cache import (
+    BookingIndex,
+    apply_booking_delete,
+    apply_booking_insert,
+    apply_booking_update,
+    bookings_version,
     get_cached_blacklist,
+    get_cached_blacklist_links,
+    get_cached_booking_index,
     get_cached_bookings,
     get_cached_schedule,
     invalidate_blacklist_cache,
     invalidate_bookings_cache,
     invalidate_schedule_cache,
+    prime_sheet_caches,
 )
 from config import (
+    ACTIVE_STATUSES,
     SPREADSHEET_NAME,
     DATE_FORMAT,
-    DATETIME_FORMAT
+    DATETIME_FORMAT,
+    MOSCOW_TZ,
+    STATUS_BLOCKED,
+    STATUS_CONFIRMED,
+    STATUS_PENDING,
+    STATUS_REJECTED,
 )
 
 # Путь к JSON-файлу сервисного аккаунта Google
 SERVICE_ACCOUNT_FILE = "credentials.json"
 
+# Файл с позицией в ленте изменений Drive, переживающей перезапуск бота
+SHEET_STATE_FILE = ".sheet_state.json"
+
 # Области доступа Google Sheets и Drive
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive",
 ]
 
+# Базовый URL Sheets API v4 для записи через aiohttp
+SHEETS_API_URL = "https://sheets.googleapis.com/v4/spreadsheets"
+
+# Пакетная запись: максимальный размер пакета и сколько ждать его
+# заполнения при высокой нагрузке
+WRITE_BATCH_MAX = 8
+WRITE_BATCH_DELAY_SEC = 0.15
+
 # Константы для листов и заголовков
 LIST_SHEET_NAME = "List"
 BLACKLIST_SHEET_NAME = "Blacklist"
@@ -58,6 +96,29 @@ BOOKING_HEADER = [
     "Причина отказа",
 ]
 
+# Запись бронирования - строка листа List. Остается обычным словарем с ключами
+# по заголовкам листа (кеш, индексы и запись изменений работают с колонками
+# по именам); TypedDict только описывает ее поля для проверки типов.
+# "_row" - номер строки в листе
+BookingRecord = TypedDict(
+    "BookingRecord",
+    {
+        "Пользователь": str,
+        "Ссылка": str,
+        "Дата": str,
+        "Время": str,
+        "Статус": str,
+        "Пользователь_ID": str,
+        "Создано": str,
+        "Опция стирки": str,
+        "Подтвердил": str,
+        "Подтверждено в": str,
+        "Причина отказа": str,
+        "_row": int,
+    },
+    total=False,
+)
+
 BLACKLIST_HEADER = ["Ссылка"]
 
 SCHEDULE_HEADER = [
@@ -66,12 +127,35 @@ SCHEDULE_HEADER = [
     "Конец",
 ]
 
-STATUS_PENDING = "На подтверждении"
-STATUS_CONFIRMED = "Подтвержден"
-STATUS_REJECTED = "Отказан"
-STATUS_BLOCKED = "Заблокировано администратором"
+# Дни недели в порядке datetime.weekday() (как в листе расписания, в нижнем регистре)
+WEEKDAYS = (
+    "понедельник",
+    "вторник",
+    "среда",
+    "четверг",
+    "пятница",
+    "суббота",
+    "воскресенье",
+)
+# Название дня недели -> индекс datetime.weekday()
+WEEKDAY_IDX = {day: idx for idx, day in enumerate(WEEKDAYS)}
+
+
+def _column_letter(col: int) -> str:
+    """Буква колонки (с 1) в A1-нотации, в том числе после Z (AA, AB, ...)."""
+    return rowcol_to_a1(1, col)[:-1]
+
 
-ACTIVE_STATUSES = {STATUS_PENDING, STATUS_CONFIRMED, STATUS_BLOCKED}
+# Последняя колонка каждого листа (заголовки не меняются)
+_END_COLUMNS = {
+    LIST_SHEET_NAME: _column_letter(len(BOOKING_HEADER)),
+    BLACKLIST_SHEET_NAME: _column_letter(len(BLACKLIST_HEADER)),
+    SCHEDULE_SHEET_NAME: _column_letter(len(SCHEDULE_HEADER)),
+}
+
+# Диапазоны всех листов, читаемые одним запросом values.batchGet
+_BATCH_SHEETS = (LIST_SHEET_NAME, BLACKLIST_SHEET_NAME, SCHEDULE_SHEET_NAME)
+_BATCH_RANGES = [f"{name}!A:{_END_COLUMNS[name]}" for name in _BATCH_SHEETS]
 
 logger = logging.getLogger(__name__)
 
@@ -80,28 +164,67 @@ _credentials = None
 _gc = None
 _drive_service = None
 _spreadsheet = None
-_list_sheet = None
-_blacklist_sheet = None
-_schedule_sheet = None
 _initialized = False
 _init_lock = asyncio.Lock()
+# Общая HTTP-сессия для записи в Sheets API: пул соединений переиспользует
+# TCP/TLS-соединения между запросами
+_http_session: Optional[aiohttp.ClientSession] = None
+# Обновление токена сервисного аккаунта выполняется одной корутиной
+_token_lock = asyncio.Lock()
+# Проверка свободного слота и запись бронирования на него выполняются под
+# этой блокировкой, чтобы два обработчика не заняли один слот одновременно
+booking_lock = asyncio.Lock()
+# ID листов (gid) для запросов batchUpdate: название листа -> sheetId
+_sheet_ids: Dict[str, int] = {}
+# Очередь операций записи и фоновая задача, отправляющая их пакетами
+_write_queue: Optional[asyncio.Queue] = None
+_writer_task: Optional[asyncio.Task] = None
+# Текущий пакетный запрос всех листов: параллельные промахи по разным
+# ключам кеша ждут один и тот же запрос
+_batch_future: Optional[asyncio.Future] = None
+
+
+async def _run(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Выполняет блокирующий вызов (gspread, googleapiclient, google-auth)
+    в отдельном потоке, не останавливая event loop.
 
+    Args:
+        func: Синхронная функция
+        *args: Аргументы функции
 
-def _ensure_header(ws: gspread.Worksheet, expected_header: List[str]) -> None:
+    Returns:
+        Результат функции
+    """
+    return await asyncio.to_thread(func, *args)
+
+
+def _ensure_headers_batch(specs: List[Tuple[str, List[str]]]) -> None:
     """
-    Проверяет и обновляет заголовок листа, если он не соответствует ожидаемому.
+    Проверяет заголовки нескольких листов одним запросом batchGet и
+    исправляет только несовпадающие одним batchUpdate.
 
     Args:
-        ws: Рабочий лист Google Sheets
-        expected_header: Ожидаемый список заголовков
+        specs: Пары (название листа, ожидаемый список заголовков)
     """
     try:
-        current_header = ws.row_values(1)
-        if current_header != expected_header:
-            end_column = chr(ord("A") + len(expected_header) - 1)
-            ws.update(f"A1:{end_column}1", [expected_header])
+        ranges = [
+            f"{name}!A1:{_column_letter(len(header))}1" for name, header in specs
+        ]
+        response = _spreadsheet.values_batch_get(ranges)
+        mismatched = []
+        for range_name, (_, expected_header), value_range in zip(
+            ranges, specs, response.get("valueRanges", [])
+        ):
+            rows = value_range.get("values") or [[]]
+            if rows[0] != expected_header:
+                mismatched.append({"range": range_name, "values": [expected_header]})
+        if mismatched:
+            _spreadsheet.values_batch_update(
+                {"valueInputOption": "RAW", "data": mismatched}
+            )
     except Exception as e:
-        logger.warning(f"Не удалось проверить/обновить заголовок листа: {e}")
+        logger.warning(f"Не удалось проверить/обновить заголовки листов: {e}")
 
 
 async def _init_google_sheets() -> bool:
@@ -112,8 +235,13 @@ async def _init_google_sheets() -> bool:
     Returns:
         True если инициализация успешна, False в случае ошибки
     """
-    global _credentials, _gc, _drive_service, _spreadsheet
-    global _list_sheet, _blacklist_sheet, _schedule_sheet, _initialized
+    global _credentials, _gc, _drive_service, _spreadsheet, _initialized
+    global _http_session, _write_queue, _writer_task
+
+    # Быстрый путь без блокировки: после инициализации функция вызывается
+    # в начале каждой операции с таблицей
+    if _initialized:
+        return True
 
     async with _init_lock:
         # Если уже инициализировано, просто возвращаем True
@@ -126,7 +254,6 @@ async def _init_google_sheets() -> bool:
             # Выполняем инициализацию в executor, чтобы не блокировать event loop
             def init():
                 global _credentials, _gc, _drive_service, _spreadsheet
-                global _list_sheet, _blacklist_sheet, _schedule_sheet
 
                 # Авторизация
                 _credentials = Credentials.from_service_account_file(
@@ -135,21 +262,46 @@ async def _init_google_sheets() -> bool:
                 )
 
                 _gc = gspread.authorize(_credentials)
+                # Один пул keep-alive соединений requests на все синхронные
+                # вызовы gspread; размер - по числу одновременных запросов к API.
+                # Повторы выполняет retry_api, поэтому у адаптера они отключены
+                _gc.http_client.session.mount(
+                    "https://",
+                    HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=API_CONCURRENCY,
+                        max_retries=0,
+                    ),
+                )
                 _drive_service = build("drive", "v3", credentials=_credentials)
 
-                # Открываем таблицу и листы
+                # Открываем таблицу; ID всех листов берем из одного запроса
+                # метаданных вместо spreadsheet.worksheet() на каждый лист
                 _spreadsheet = _gc.open(SPREADSHEET_NAME)
-                _list_sheet = _spreadsheet.worksheet(LIST_SHEET_NAME)
-                _blacklist_sheet = _spreadsheet.worksheet(BLACKLIST_SHEET_NAME)
-                _schedule_sheet = _spreadsheet.worksheet(SCHEDULE_SHEET_NAME)
+                metadata = _spreadsheet.fetch_sheet_metadata()
+                for sheet in metadata["sheets"]:
+                    properties = sheet["properties"]
+                    _sheet_ids[properties["title"]] = properties["sheetId"]
+                for name in _BATCH_SHEETS:
+                    if name not in _sheet_ids:
+                        raise gspread.exceptions.WorksheetNotFound(name)
 
                 # Проверяем заголовки
-                _ensure_header(_list_sheet, BOOKING_HEADER)
-                _ensure_header(_blacklist_sheet, BLACKLIST_HEADER)
-                _ensure_header(_schedule_sheet, SCHEDULE_HEADER)
+                _ensure_headers_batch([
+                    (LIST_SHEET_NAME, BOOKING_HEADER),
+                    (BLACKLIST_SHEET_NAME, BLACKLIST_HEADER),
+                    (SCHEDULE_SHEET_NAME, SCHEDULE_HEADER),
+                ])
 
             # Выполняем в отдельном потоке
-            await asyncio.get_event_loop().run_in_executor(None, init)
+            await _run(init)
+
+            # Сессия создается в event loop, в котором будет использоваться
+            _http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=60)
+            )
+            _write_queue = asyncio.Queue()
+            _writer_task = asyncio.create_task(_flush_writer())
 
             _initialized = True
             logger.info("✅ Google Sheets успешно инициализирован")
@@ -163,171 +315,831 @@ async def _init_google_sheets() -> bool:
             return False
 
 
-def _get_sheets():
+# HTTP-статусы, при которых запрос к Google API имеет смысл повторить:
+# превышение квоты и временные ошибки сервера
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Не больше стольких одновременных запросов к Google API: обработчики VK,
+# цикл уведомлений и writer иначе легко упираются в квоту (429)
+API_CONCURRENCY = 8
+_api_sem = asyncio.Semaphore(API_CONCURRENCY)
+
+
+def _error_status(error: BaseException) -> Optional[int]:
     """
-    Возвращает объекты листов. Используется внутренними функциями.
-    Предполагается, что инициализация уже выполнена.
+    Возвращает HTTP-статус ошибки Google API (gspread, googleapiclient или aiohttp).
+
+    Args:
+        error: Исключение
+
+    Returns:
+        HTTP-статус или None, если ошибка не связана с ответом API
     """
-    if not _initialized:
-        raise RuntimeError(
-            "Google Sheets не инициализирован. "
-            "Вызовите await _init_google_sheets() перед использованием."
-        )
-    return _list_sheet, _blacklist_sheet, _schedule_sheet, _spreadsheet, _drive_service
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.response.status_code
+    if isinstance(error, HttpError):
+        return error.resp.status
+    return None
 
 
-def with_retries(loader, retries=5, base_delay=0.5):
-    def wrapped():
-        delay = base_delay
-        for attempt in range(retries):
-            try:
-                return loader()
-            except Exception as e:
-                if attempt == retries - 1:
-                    raise
-                time.sleep(delay)
-                delay *= 2
-        return loader()
-    return wrapped
+def _retry_after(error: BaseException) -> Optional[float]:
+    """
+    Возвращает задержку из заголовка Retry-After ответа API, если он есть.
+    Поддерживается только форма с числом секунд.
+
+    Args:
+        error: Исключение
+
+    Returns:
+        Задержка в секундах или None
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        headers = error.headers
+    elif isinstance(error, gspread.exceptions.APIError):
+        headers = error.response.headers
+    elif isinstance(error, HttpError):
+        headers = error.resp
+    else:
+        return None
+    # Заголовки aiohttp и requests регистронезависимы, httplib2 хранит их в нижнем регистре
+    value = headers.get("retry-after") if headers else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Проверяет, стоит ли повторять запрос после этой ошибки."""
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return True
+    return _error_status(error) in RETRYABLE_STATUSES
 
 
+async def retry_api(
+    coro_factory: Callable[[], Awaitable[Any]],
+    retries: int = 5,
+    base: float = 1.0,
+    cap: float = 30.0,
+    jitter: float = 0.5,
+) -> Any:
+    """
+    Выполняет запрос к Google API с повторами и экспоненциальной задержкой.
+    Повторяются только 429, 5xx и обрывы соединения; остальные ошибки
+    (например, 4xx авторизации или 409/412) пробрасываются сразу, поэтому
+    неидемпотентные записи не дублируются на заведомо неуспешных ответах.
+    Случайная добавка к задержке разводит во времени повторы
+    одновременно упавших запросов; если API прислал Retry-After,
+    ждем не меньше указанного (но не дольше cap). Каждая попытка занимает место в _api_sem,
+    а ожидание перед повтором - нет.
+
+    Args:
+        coro_factory: Функция, создающая новую корутину запроса для каждой попытки
+        retries: Максимальное число попыток
+        base: Базовая задержка в секундах
+        cap: Максимальная задержка в секундах
+        jitter: Максимальная случайная добавка к задержке (доля от нее)
+
+    Returns:
+        Результат запроса
+    """
+    for attempt in range(retries):
+        try:
+            async with _api_sem:
+                return await coro_factory()
+        except Exception as e:
+            if attempt == retries - 1 or not _is_retryable(e):
+                raise
+            delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(0, jitter))
+            retry_after = _retry_after(e)
+            if retry_after is not None:
+                delay = max(delay, min(cap, retry_after))
+            logger.warning(
+                f"Ошибка Google API ({e}), повтор через {delay:.1f} с "
+                f"(попытка {attempt + 1} из {retries})"
+            )
+            await asyncio.sleep(delay)
+
 
 # -------------------------
-# Проверка изменений в Google Sheets
+# Асинхронный клиент Sheets API
 # -------------------------
 
-def _get_sheet_modified_time() -> Optional[datetime]:
+async def _auth_headers() -> Dict[str, str]:
     """
-    Получает время последнего изменения таблицы через Drive API.
+    Возвращает заголовок авторизации с действующим токеном.
+    Токен обновляется в executor и только когда он истек.
 
     Returns:
-        Время последнего изменения или None при ошибке
+        Словарь с заголовком Authorization
     """
-    if not _initialized:
+    if not _credentials.valid:
+        async with _token_lock:
+            if not _credentials.valid:
+                await _run(_credentials.refresh, GoogleAuthRequest())
+    return {"Authorization": f"Bearer {_credentials.token}"}
+
+
+async def _request(
+    method: str,
+    path: str,
+    *,
+    params: Optional[Dict[str, str]] = None,
+    json: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Выполняет запрос к Sheets API для текущей таблицы.
+    Временные ошибки (429, 5xx) повторяются через retry_api.
+
+    Args:
+        method: HTTP-метод
+        path: Путь относительно таблицы (например, "/values/List!A1:K1")
+        params: Параметры строки запроса
+        json: Тело запроса
+
+    Returns:
+        Ответ API в виде словаря
+
+    Raises:
+        aiohttp.ClientResponseError: Если API вернул ошибку
+    """
+    url = f"{SHEETS_API_URL}/{_spreadsheet.id}{path}"
+
+    async def send() -> Dict[str, Any]:
+        headers = await _auth_headers()
+        async with _http_session.request(
+            method, url, params=params, json=json, headers=headers
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    return await retry_api(send)
+
+
+def _values_path(range_name: str, suffix: str = "") -> str:
+    """Путь к ресурсу values для диапазона в A1-нотации."""
+    return f"/values/{quote(range_name, safe='!:')}{suffix}"
+
+
+class _RowGuard:
+    """
+    Согласует операции, адресующие строки листа по номеру.
+    Удаление строки сдвигает номера всех строк ниже, поэтому оно выполняется
+    монопольно: ждет завершения начатых обновлений, а новые операции
+    вычисляют номер строки только после того, как удаление записано в лист
+    и кеш сдвинут. Обновления друг другу не мешают и по-прежнему попадают
+    в один пакет.
+    """
+
+    def __init__(self) -> None:
+        self._condition = asyncio.Condition()
+        self._shared = 0
+        self._exclusive = False
+
+    @asynccontextmanager
+    async def shared(self):
+        """Обновление ячеек по номеру строки."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._exclusive)
+            self._shared += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._shared -= 1
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def exclusive(self):
+        """Удаление строки."""
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: not self._exclusive and not self._shared
+            )
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._exclusive = False
+                self._condition.notify_all()
+
+
+# Номер строки записи берется из кеша и действителен, пока выше не удалена
+# другая строка, - операции по номерам строк согласуются по листам
+_row_guards = {LIST_SHEET_NAME: _RowGuard(), BLACKLIST_SHEET_NAME: _RowGuard()}
+
+
+class _WriteOp(NamedTuple):
+    """Операция записи в очереди: вид, лист или диапазон, данные и Future результата."""
+
+    kind: str  # "append", "update" или "delete"
+    target: str  # название листа (append, delete) или диапазон (update)
+    payload: Any  # строка значений, строки значений или номер строки
+    future: asyncio.Future
+
+
+def _enqueue_write(kind: str, target: str, payload: Any) -> asyncio.Future:
+    """
+    Ставит операцию записи в очередь фонового writer'а.
+
+    Args:
+        kind: Вид операции ("append", "update" или "delete")
+        target: Название листа
+        payload: Данные операции
+
+    Returns:
+        Future, который завершается после отправки пакета с этой операцией
+    """
+    future = asyncio.get_running_loop().create_future()
+    _write_queue.put_nowait(_WriteOp(kind, target, payload, future))
+    return future
+
+
+async def _append_row(sheet_name: str, values: List[str]) -> Optional[int]:
+    """
+    Добавляет строку в конец листа (values.append) через очередь записи.
+
+    Args:
+        sheet_name: Название листа
+        values: Значения ячеек строки
+
+    Returns:
+        Номер добавленной строки или None, если API его не вернул
+    """
+    return await _enqueue_write("append", sheet_name, values)
+
+
+async def _update_cells(sheet_name: str, cells: Dict[str, str]) -> None:
+    """
+    Записывает значения отдельных ячеек через очередь записи (values.batchUpdate).
+
+    Args:
+        sheet_name: Название листа
+        cells: Значения по адресам ячеек, например {"F2": "confirmed"}
+    """
+    data = [
+        {"range": f"{sheet_name}!{cell}", "values": [[value]]}
+        for cell, value in cells.items()
+    ]
+    await _enqueue_write("update", sheet_name, data)
+
+
+async def _delete_row(sheet_name: str, row_number: int) -> None:
+    """
+    Удаляет строку листа через очередь записи (batchUpdate с deleteDimension).
+
+    Args:
+        sheet_name: Название листа
+        row_number: Номер строки (с 1)
+    """
+    await _enqueue_write("delete", sheet_name, row_number)
+
+
+def _resolve_writes(
+    ops: List[_WriteOp],
+    error: Optional[BaseException] = None,
+    results: Optional[List[Any]] = None,
+) -> None:
+    """
+    Завершает Future операций результатом или исключением.
+
+    Args:
+        ops: Операции пакета
+        error: Ошибка отправки (None, если пакет записан)
+        results: Результаты операций по порядку (по умолчанию None для всех)
+    """
+    for i, op in enumerate(ops):
+        if op.future.done():
+            continue
+        if error is None:
+            op.future.set_result(results[i] if results is not None else None)
+        else:
+            op.future.set_exception(error)
+
+
+# Первая строка диапазона в A1-нотации, например 15 для "List!A15:K17"
+_FIRST_ROW_RE = re.compile(r"![A-Z]*(\d+)")
+
+
+def _appended_rows(response: Dict[str, Any], count: int) -> Optional[List[int]]:
+    """
+    Возвращает номера строк, в которые values.append записал данные.
+
+    Args:
+        response: Ответ values.append
+        count: Количество добавленных строк
+
+    Returns:
+        Номера строк по порядку или None, если ответ их не содержит
+    """
+    updated_range = response.get("updates", {}).get("updatedRange", "")
+    match = _FIRST_ROW_RE.search(updated_range)
+    if not match:
         return None
+    first = int(match.group(1))
+    return list(range(first, first + count))
+
+
+async def _send_values(ops: List[_WriteOp]) -> None:
+    """
+    Отправляет подряд идущие добавления и обновления строк.
+    Все обновления уходят одним values:batchUpdate, добавления -
+    одним values:append на каждый лист.
+
+    Args:
+        ops: Операции "append" и "update" в порядке постановки в очередь
+    """
+    updates = [op for op in ops if op.kind == "update"]
+    appends: Dict[str, List[_WriteOp]] = {}
+    for op in ops:
+        if op.kind == "append":
+            appends.setdefault(op.target, []).append(op)
+
+    if updates:
+        try:
+            await _request(
+                "POST",
+                "/values:batchUpdate",
+                json={
+                    "valueInputOption": "RAW",
+                    "data": [item for op in updates for item in op.payload],
+                },
+            )
+        except Exception as e:
+            _resolve_writes(updates, e)
+        else:
+            _resolve_writes(updates)
+
+    for sheet_name, sheet_ops in appends.items():
+        try:
+            response = await _request(
+                "POST",
+                _values_path(sheet_name, ":append"),
+                params={"valueInputOption": "RAW"},
+                json={"values": [op.payload for op in sheet_ops]},
+            )
+        except Exception as e:
+            _resolve_writes(sheet_ops, e)
+        else:
+            _resolve_writes(sheet_ops, results=_appended_rows(response, len(sheet_ops)))
+
+
+async def _send_deletes(ops: List[_WriteOp]) -> None:
+    """
+    Отправляет подряд идущие удаления строк одним batchUpdate.
+    Номера строк всех операций пакета даны для одного состояния листа,
+    а запросы внутри batchUpdate применяются по порядку, поэтому строки
+    удаляются снизу вверх: удаление нижней строки не сдвигает верхние.
 
+    Args:
+        ops: Операции "delete" в порядке постановки в очередь
+    """
+    ordered = sorted(ops, key=lambda op: op.payload, reverse=True)
+    requests = [
+        {
+            "deleteDimension": {
+                "range": {
+                    "sheetId": _sheet_ids[op.target],
+                    "dimension": "ROWS",
+                    "startIndex": op.payload - 1,
+                    "endIndex": op.payload,
+                }
+            }
+        }
+        for op in ordered
+    ]
     try:
-        _, _, _, spreadsheet, drive_service = _get_sheets()
-        # Получаем ID файла таблицы
-        file_id = spreadsheet.id
-
-        # Получаем информацию о файле
-        file_metadata = drive_service.files().get(
-            fileId=file_id,
-            fields="modifiedTime"
+        await _request("POST", ":batchUpdate", json={"requests": requests})
+    except Exception as e:
+        _resolve_writes(ops, e)
+    else:
+        _resolve_writes(ops)
+
+
+async def _apply_writes(batch: List[_WriteOp]) -> None:
+    """
+    Отправляет пакет операций записи с сохранением порядка.
+    Удаление сдвигает номера строк, поэтому служит границей:
+    пакет режется на группы "добавления/обновления" и "удаления".
+
+    Args:
+        batch: Операции в порядке постановки в очередь
+    """
+    group: List[_WriteOp] = []
+    for op in batch:
+        if group and (op.kind == "delete") != (group[0].kind == "delete"):
+            await (_send_deletes if group[0].kind == "delete" else _send_values)(group)
+            group = []
+        group.append(op)
+    if group:
+        await (_send_deletes if group[0].kind == "delete" else _send_values)(group)
+
+
+async def _flush_writer() -> None:
+    """
+    Фоновая задача: забирает операции из очереди и отправляет их пакетами.
+    Размер пакета подстраивается под нагрузку: растет, пока очередь
+    не успевает опустеть, и уменьшается до 1, когда она пуста, так что
+    одиночная запись уходит сразу, без ожидания.
+    """
+    loop = asyncio.get_running_loop()
+    batch_target = 1
+    while True:
+        batch = [await _write_queue.get()]
+        deadline = loop.time() + WRITE_BATCH_DELAY_SEC
+        while len(batch) < batch_target:
+            if not _write_queue.empty():
+                batch.append(_write_queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_write_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        try:
+            await _apply_writes(batch)
+        except Exception as e:
+            logger.error(f"Ошибка отправки пакета записей в Google Sheets: {e}")
+            _resolve_writes(batch, e)
+
+        if _write_queue.qsize() > len(batch):
+            batch_target = min(batch_target * 2, WRITE_BATCH_MAX)
+        elif _write_queue.empty():
+            batch_target = max(batch_target // 2, 1)
+
+
+async def close_google_sheets() -> None:
+    """Останавливает writer и закрывает HTTP-сессию Sheets API. Вызывается при завершении бота."""
+    global _http_session, _writer_task
+    if _writer_task is not None:
+        _writer_task.cancel()
+        try:
+            await _writer_task
+        except asyncio.CancelledError:
+            pass
+        _writer_task = None
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+
+# -------------------------
+# Проверка изменений в Google Sheets
+# -------------------------
+
+def _get_start_page_token() -> str:
+    """
+    Получает токен текущей позиции в ленте изменений Drive.
+
+    Returns:
+        Токен страницы для changes.list
+    """
+    response = _drive_service.changes().getStartPageToken().execute()
+    return response["startPageToken"]
+
+
+def _list_changes(page_token: str) -> Tuple[bool, str]:
+    """
+    Читает ленту изменений Drive начиная с токена.
+    Пустой ответ (изменений нет) намного меньше полных метаданных файла.
+
+    Args:
+        page_token: Токен, сохраненный после прошлой проверки
+
+    Returns:
+        Кортеж (изменялась ли таблица, токен для следующей проверки)
+    """
+    changed = False
+    while True:
+        response = _drive_service.changes().list(
+            pageToken=page_token,
+            fields="nextPageToken,newStartPageToken,changes(fileId)",
+            pageSize=100,
         ).execute()
+        if any(change.get("fileId") == _spreadsheet.id for change in response.get("changes", [])):
+            changed = True
+        if "newStartPageToken" in response:
+            return changed, response["newStartPageToken"]
+        page_token = response["nextPageToken"]
 
-        modified_time_str = file_metadata.get("modifiedTime")
-        if modified_time_str:
-            # Парсим время в формате ISO 8601
-            # Убираем 'Z' и добавляем '+00:00' для правильного парсинга
-            modified_time_str = modified_time_str.replace("Z", "+00:00")
-            return datetime.fromisoformat(modified_time_str)
-    except Exception as e:
-        logger.warning(f"Не удалось получить время изменения таблицы: {e}")
-    return None
+
+def _load_page_token() -> Optional[str]:
+    """
+    Читает сохраненный токен ленты изменений Drive из SHEET_STATE_FILE.
+
+    Returns:
+        Токен или None, если файла нет или он поврежден
+    """
+    try:
+        with open(SHEET_STATE_FILE, encoding="utf-8") as f:
+            return json.load(f).get("pageToken")
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, AttributeError) as e:
+        logger.warning(f"Не удалось прочитать {SHEET_STATE_FILE}: {e}")
+        return None
+
+
+def _save_page_token(page_token: str) -> None:
+    """
+    Сохраняет токен ленты изменений Drive в SHEET_STATE_FILE.
+    Файл записывается во временный и подменяется через os.replace,
+    поэтому при падении посреди записи старое состояние не портится.
+
+    Args:
+        page_token: Токен для следующей проверки
+    """
+    tmp_path = f"{SHEET_STATE_FILE}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"pageToken": page_token}, f)
+        os.replace(tmp_path, SHEET_STATE_FILE)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить {SHEET_STATE_FILE}: {e}")
 
 
-# Храним время последнего изменения таблицы
-_last_modified_time: Optional[datetime] = None
+# Токен ленты изменений Drive, с которого начнется следующая проверка
+_changes_page_token: Optional[str] = None
 
 
 async def check_sheet_changes() -> None:
     """
     Проверяет изменения в Google Sheets и инвалидирует кеш при необходимости.
     Вызывается периодически для автоматического обновления кеша при ручных изменениях в таблице.
+    Опрашивает ленту изменений Drive (changes.list) вместо метаданных файла.
     """
-    global _last_modified_time
+    global _changes_page_token
 
-    current_time = _get_sheet_modified_time()
-
-    if current_time is None:
-        # Если не удалось получить время, пропускаем проверку
+    if not _initialized:
         return
 
-    # Если это первая проверка, просто сохраняем время
-    if _last_modified_time is None:
-        _last_modified_time = current_time
+    try:
+        # При первой проверке продолжаем с позиции, сохраненной до перезапуска,
+        # а если ее нет - только запоминаем текущую позицию в ленте
+        if _changes_page_token is None:
+            _changes_page_token = _load_page_token()
+        if _changes_page_token is None:
+            _changes_page_token = await retry_api(lambda: _run(_get_start_page_token))
+            _save_page_token(_changes_page_token)
+            return
+
+        changed, new_token = await retry_api(
+            lambda: _run(_list_changes, _changes_page_token)
+        )
+    except Exception as e:
+        logger.warning(f"Не удалось получить изменения таблицы из Drive: {e}")
+        if _error_status(e) in (400, 404, 410):
+            # Сохраненный токен больше не принимается - начнем с текущей позиции
+            _changes_page_token = None
         return
 
-    # Если время изменилось, значит были изменения в таблице
-    if current_time > _last_modified_time:
-        logger.info(
-            f"Обнаружены изменения в Google Sheets "
-            f"(было: {_last_modified_time}, стало: {current_time}), "
-            f"инвалидируем весь кеш"
-        )
-        # Инвалидируем все кеши, так как мы не знаем, какой именно лист изменился
-        await invalidate_bookings_cache()
-        await invalidate_blacklist_cache()
-        await invalidate_schedule_cache()
-        _last_modified_time = current_time
+    if new_token != _changes_page_token:
+        _changes_page_token = new_token
+        _save_page_token(new_token)
+    if changed:
+        logger.info("Обнаружены изменения в Google Sheets, обновляем кеш")
+        # Лента Drive не говорит, какой лист изменился: читаем все одним
+        # batchGet и заменяем кеши только листов с новым отпечатком значений,
+        # остальные сохраняют свои индексы и представления
+        try:
+            await _load_all_sheets(changed_only=True)
+        except Exception as e:
+            logger.warning(f"Не удалось обновить кеш после изменений в таблице: {e}")
+            await invalidate_bookings_cache()
+            await invalidate_blacklist_cache()
+            await invalidate_schedule_cache()
 
 
-def _fetch_records(sheet) -> List[Dict[str, str]]:
+def _fetch_records(values: List[List[str]]) -> List[Dict[str, str]]:
     """
-    Извлекает все записи из листа Google Sheets.
+    Преобразует значения листа Google Sheets в список записей.
     
     Args:
-        sheet: Рабочий лист Google Sheets
+        values: Строки листа, первая строка - заголовок
         
     Returns:
         Список словарей с данными записей, каждая запись содержит поле "_row" с номером строки
     """
-    values = sheet.get_all_values()
     if not values:
         return []
-    header = values[0]
+    # Интернируем заголовки, чтобы ключи записей совпадали по объекту
+    # с константами колонок в cache.py
+    header = [sys.intern(column) for column in values[0]]
+    header_len = len(header)
     records: List[Dict[str, str]] = []
     for idx, row in enumerate(values[1:], start=2):
-        if not any(cell.strip() for cell in row):
+        # join + strip выполняются в C, без генератора на каждую строку
+        if not "".join(row).strip():
             continue
-        record = {header[i]: row[i] if i < len(row) else "" for i in range(len(header))}
+        # API обрезает пустые ячейки в конце строки - дополняем до заголовка
+        if len(row) < header_len:
+            row = row + [""] * (header_len - len(row))
+        record = dict(zip(header, row))
         record["_row"] = idx  # техническое поле для обновлений
         records.append(record)
     return records
 
 
-def _row_range(row_number: int) -> str:
-    end_column = chr(ord("A") + len(BOOKING_HEADER) - 1)
-    return f"A{row_number}:{end_column}{row_number}"
+def _parse_blacklist(values: List[List[str]]) -> Dict[str, int]:
+    """
+    Извлекает ссылки черного списка из значений листа (без заголовка).
 
+    Args:
+        values: Строки листа, первая строка - заголовок
 
-def _values_from_record(record: Dict[str, str]) -> List[str]:
-    return [record.get(column, "") for column in BOOKING_HEADER]
+    Returns:
+        Словарь ссылка -> номер строки для непустых ссылок в порядке листа.
+        Для повторяющейся ссылки хранится первая строка.
+    """
+    rows: Dict[str, int] = {}
+    for idx, row in enumerate(values[1:], start=2):
+        if row and row[0].strip():
+            rows.setdefault(row[0], idx)
+    return rows
 
 
-def _filter_records(
-    records: Iterable[Dict[str, str]],
-    *,
-    date: Optional[datetime.date] = None,
-    user_id: Optional[int] = None,
-    statuses: Optional[Iterable[str]] = None,
-) -> List[Dict[str, str]]:
-    filtered = []
-    date_str = str(date) if date else None
-    user_id_str = str(user_id) if user_id is not None else None
-    statuses_set = set(statuses) if statuses else None
+def _parse_schedule(records: List[Dict[str, str]]) -> Dict[int, Tuple[int, int]]:
+    """
+    Разбирает записи листа расписания один раз при загрузке в кеш.
+    Строки с неизвестным днем недели или нечисловыми часами пропускаются.
+
+    Args:
+        records: Записи листа расписания
+
+    Returns:
+        Словарь: индекс дня недели (0=понедельник) -> (час начала, час окончания)
+    """
+    schedule: Dict[int, Tuple[int, int]] = {}
     for record in records:
-        if date_str and record.get("Дата") != date_str:
+        idx = WEEKDAY_IDX.get(record.get("День недели", "").strip().lower())
+        if idx is None:
             continue
-        if user_id_str and record.get("Пользователь_ID") != user_id_str:
-            continue
-        if statuses_set and record.get("Статус") not in statuses_set:
+        try:
+            hours = (int(record.get("Начало")), int(record.get("Конец")))
+        except (TypeError, ValueError):
+            logger.warning(f"Некорректная строка расписания: {record}")
             continue
-        filtered.append(record)
-    return filtered
+        # Как и раньше, при повторе дня действует первая строка
+        schedule.setdefault(idx, hours)
+    return schedule
+
+
+def _values_digest(values: List[List[str]]) -> bytes:
+    """Отпечаток значений листа для сравнения с предыдущей загрузкой."""
+    return hashlib.blake2b(
+        json.dumps(values, ensure_ascii=False).encode(), digest_size=16
+    ).digest()
+
+
+def _batch_fetch_all() -> Tuple[Dict[str, List[List[str]]], Dict[str, bytes]]:
+    """
+    Читает все листы одним запросом spreadsheets.values.batchGet.
+
+    Returns:
+        Кортеж (название листа -> строки листа вместе с заголовком,
+        название листа -> отпечаток его значений)
+    """
+    response = _spreadsheet.values_batch_get(_BATCH_RANGES)
+    value_ranges = response.get("valueRanges", [])
+    values = {
+        name: value_range.get("values", [])
+        for name, value_range in zip(_BATCH_SHEETS, value_ranges)
+    }
+    digests = {name: _values_digest(sheet) for name, sheet in values.items()}
+    return values, digests
+
+
+# Отпечатки листов из последней пакетной загрузки: по ним при изменении
+# таблицы обновляются кеши только тех листов, которые действительно изменились
+_sheet_digests: Dict[str, bytes] = {}
+
+
+async def _load_all_sheets(
+    requested: Optional[str] = None,
+    changed_only: bool = False,
+) -> Dict[str, Any]:
+    """
+    Загружает все листы одним пакетным запросом и заполняет кеши остальных листов.
+    Если запрос уже выполняется, ждет его результата вместо нового запроса.
+
+    Args:
+        requested: Название листа, для которого вызван loader; его кеш
+            заполнит сам вызывающий через Cache.get (None - заполнить все)
+        changed_only: Заменить кеши только тех листов, значения которых
+            изменились с прошлой загрузки (кеши изменившихся листов
+            предварительно инвалидируются, чтобы сработали их обработчики)
+
+    Returns:
+        Словарь: название листа -> разобранные данные листа
+    """
+    global _batch_future
+    if _batch_future is not None:
+        return await asyncio.shield(_batch_future)
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _batch_future = future
+    # Записи бронирований, сделанные во время запроса, в снимок не попадут
+    version = bookings_version()
+    try:
+        values, digests = await retry_api(lambda: _run(_batch_fetch_all))
+        parsed = {
+            LIST_SHEET_NAME: _fetch_records(values.get(LIST_SHEET_NAME, [])),
+            BLACKLIST_SHEET_NAME: _parse_blacklist(values.get(BLACKLIST_SHEET_NAME, [])),
+            SCHEDULE_SHEET_NAME: _parse_schedule(
+                _fetch_records(values.get(SCHEDULE_SHEET_NAME, []))
+            ),
+        }
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            # Помечаем исключение как полученное, если ожидающих не было
+            future.exception()
+        raise
+    finally:
+        if _batch_future is future:
+            _batch_future = None
+
+    future.set_result(parsed)
+    # Одним запросом получены все листы - кладем остальные в кеш сразу,
+    # чтобы следующие промахи по другим ключам не ходили в сеть
+    prime = {name for name in _BATCH_SHEETS if name != requested}
+    bookings_stale = bookings_version() != version
+    if changed_only:
+        prime = {name for name in prime if digests[name] != _sheet_digests.get(name)}
+        if LIST_SHEET_NAME in prime:
+            await invalidate_bookings_cache()
+        if BLACKLIST_SHEET_NAME in prime:
+            await invalidate_blacklist_cache()
+        if SCHEDULE_SHEET_NAME in prime:
+            await invalidate_schedule_cache()
+    if bookings_stale:
+        # Кеш бронирований изменился после чтения листа: снимок его бы затер
+        prime.discard(LIST_SHEET_NAME)
+    _sheet_digests.update(digests)
+    prime_sheet_caches(
+        bookings=parsed[LIST_SHEET_NAME] if LIST_SHEET_NAME in prime else None,
+        blacklist=parsed[BLACKLIST_SHEET_NAME] if BLACKLIST_SHEET_NAME in prime else None,
+        schedule=parsed[SCHEDULE_SHEET_NAME] if SCHEDULE_SHEET_NAME in prime else None,
+    )
+    return parsed
+
+
+# Буква колонки листа бронирований для каждого поля (заголовок не меняется)
+_BOOKING_COLUMNS = {
+    name: _column_letter(i) for i, name in enumerate(BOOKING_HEADER, start=1)
+}
+
+
+# Значения записи в порядке колонок листа одним вызовом на C
+_booking_values = itemgetter(*BOOKING_HEADER)
+# Пустые значения всех колонок для записей, в которых каких-то колонок нет
+_BOOKING_DEFAULTS = dict.fromkeys(BOOKING_HEADER, "")
+
+
+def _values_from_record(record: BookingRecord) -> List[str]:
+    try:
+        return list(_booking_values(record))
+    except KeyError:
+        return list(_booking_values({**_BOOKING_DEFAULTS, **record}))
 
 
 # -------------------------
 # Работа с бронированиями
 # -------------------------
+async def _load_bookings() -> List[BookingRecord]:
+    """Loader кеша бронирований: все записи листа List."""
+    sheets = await _load_all_sheets(LIST_SHEET_NAME)
+    return sheets[LIST_SHEET_NAME]
+
+
+async def _get_booking_index() -> Optional[BookingIndex]:
+    """
+    Возвращает индексированные бронирования из кеша или из Google Sheets.
+
+    Returns:
+        BookingIndex или None, если подключиться не удалось
+    """
+    if not await _init_google_sheets():
+        logger.error("Не удалось подключиться к Google Sheets")
+        return None
+    return await get_cached_booking_index(_load_bookings)
+
 async def get_bookings(
     *,
     date: Optional[datetime.date] = None,
     user_id: Optional[int] = None,
     statuses: Optional[Iterable[str]] = None,
-) -> List[Dict[str, str]]:
+) -> List[BookingRecord]:
     """
     Получает список бронирований с возможностью фильтрации.
     Использует кеширование для оптимизации производительности.
@@ -345,14 +1157,8 @@ async def get_bookings(
         logger.error("Не удалось подключиться к Google Sheets")
         return []
 
-    list_sheet, _, _, _, _ = _get_sheets()
-
-    # Загружаем все бронирования из кеша или из таблицы
-    def loader():
-        return _fetch_records(list_sheet)
-
     if date:
-        date_str = str(datetime.strftime(date, DATE_FORMAT))
+        date_str = date.strftime(DATE_FORMAT)
     else:
         date_str = None
 
@@ -364,8 +1170,9 @@ async def get_bookings(
         statuses_tuple = tuple(statuses)
 
 
+    # Загружаем все бронирования из кеша или из таблицы
     all_records = await get_cached_bookings(
-        loader=with_retries(loader),
+        loader=_load_bookings,
         date=date_str,
         user_id=user_id,
         statuses=statuses_tuple,
@@ -374,6 +1181,29 @@ async def get_bookings(
     return all_records
 
 
+async def get_bookings_page(
+    *,
+    statuses: Optional[Iterable[str]] = None,
+    offset: int = 0,
+    limit: int = 8,
+) -> Tuple[List[BookingRecord], int]:
+    """
+    Получает одну страницу бронирований в порядке даты и времени.
+    Записи берутся из индекса кеша, уже отсортированного при загрузке,
+    поэтому копируется только сама страница.
+
+    Args:
+        statuses: Фильтр по статусам (опционально)
+        offset: Сколько записей пропустить
+        limit: Размер страницы
+
+    Returns:
+        Кортеж (записи страницы, общее число записей по фильтру)
+    """
+    records = await get_bookings(statuses=statuses)
+    return records[offset:offset + limit], len(records)
+
+
 async def add_booking(
     user_name: str,
     user_link: str,
@@ -405,9 +1235,6 @@ async def add_booking(
         logger.error("Не удалось подключиться к Google Sheets")
         return None
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
     date_str = str(date)
     record = {
         "Пользователь": user_name,
@@ -422,38 +1249,50 @@ async def add_booking(
         "Подтверждено в": confirmed_at,
         "Причина отказа": decline_reason,
     }
-    list_sheet.append_row(_values_from_record(record))
-    # Инвалидируем кеш бронирований после добавления
-    await invalidate_bookings_cache()
+    row = await _append_row(LIST_SHEET_NAME, _values_from_record(record))
+    # Добавляем запись прямо в кеш, без повторного чтения листа
+    if row is None:
+        await invalidate_bookings_cache()
+    else:
+        record["_row"] = row
+        await apply_booking_insert(record)
 
 
-async def update_booking(record: Dict[str, str], updates: Dict[str, str]) -> Dict[str, str]:
+async def update_booking(record: BookingRecord, updates: Dict[str, str]) -> BookingRecord:
     if not await _init_google_sheets():
         logger.error("Не удалось подключиться к Google Sheets")
         return {}
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
-    updated = {**record, **updates}
-    list_sheet.update(_row_range(record["_row"]), [_values_from_record(updated)])
-    updated["_row"] = record["_row"]
-    # Инвалидируем кеш бронирований после обновления
-    await invalidate_bookings_cache()
+    # Пока обновление не записано в кеш, строки выше не удаляются
+    async with _row_guards[LIST_SHEET_NAME].shared():
+        row = record["_row"]
+        updated = {**record, **updates}
+        # Отправляем только изменившиеся ячейки, а не всю строку
+        cells = {
+            f"{_BOOKING_COLUMNS[key]}{row}": value
+            for key, value in updates.items()
+            if key in _BOOKING_COLUMNS and record.get(key) != value
+        }
+        if cells:
+            await _update_cells(LIST_SHEET_NAME, cells)
+        updated["_row"] = row
+        # Обновляем запись прямо в кеше, без повторного чтения листа
+        if cells:
+            await apply_booking_update(updated)
     return updated
 
 
-async def delete_booking(record: Dict[str, str]) -> bool:
+async def delete_booking(record: BookingRecord) -> bool:
     if not await _init_google_sheets():
         logger.error("Не удалось подключиться к Google Sheets")
         return False
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
     try:
-        list_sheet.delete_rows(record["_row"])
-        await invalidate_bookings_cache()
+        # Номер строки читается, когда предыдущие удаления уже сдвинули кеш
+        async with _row_guards[LIST_SHEET_NAME].exclusive():
+            row = record["_row"]
+            await _delete_row(LIST_SHEET_NAME, row)
+            await apply_booking_delete(row)
         return True
     except Exception:
         return False
@@ -461,62 +1300,58 @@ async def delete_booking(record: Dict[str, str]) -> bool:
 
 
 async def is_time_free(date: datetime.date, time_slot: str) -> bool:
-    records = await get_bookings(date=date)
-    for record in records:
-        if record.get("Время") == time_slot and record.get("Статус") in ACTIVE_STATUSES:
-            return False
-    return True
+    index = await _get_booking_index()
+    if index is None:
+        return True
+    date_str = date.strftime(DATE_FORMAT)
+    return time_slot not in index.active_slots.get(date_str, ())
 
 
-async def get_user_active_bookings(user_id: int) -> List[Dict[str, str]]:
+async def get_user_active_bookings(user_id: int) -> List[BookingRecord]:
     return await get_bookings(
         user_id=user_id,
         statuses=ACTIVE_STATUSES,
     )
 
 
-async def get_pending_bookings() -> List[Dict[str, str]]:
+async def get_pending_bookings() -> List[BookingRecord]:
     return await get_bookings(statuses={STATUS_PENDING})
 
 
-async def get_admin_blockings() -> List[Dict[str, str]]:
+async def get_admin_blockings() -> List[BookingRecord]:
     return await get_bookings(statuses={STATUS_BLOCKED})
 
 
-async def set_booking_confirmed(record: Dict[str, str], admin_name: str) -> Dict[str, str]:
-    offset = timedelta(hours=3)
-    moscow_tz = timezone(offset, name='МСК')
-    now = datetime.now(moscow_tz)
+async def set_booking_confirmed(record: BookingRecord, admin_name: str) -> BookingRecord:
+    now = datetime.now(MOSCOW_TZ)
 
     return await update_booking(
         record,
         {
             "Статус": STATUS_CONFIRMED,
             "Подтвердил": admin_name,
-            "Подтверждено в": datetime.strftime(now, DATETIME_FORMAT),
+            "Подтверждено в": now.strftime(DATETIME_FORMAT),
             "Причина отказа": "",
         },
     )
 
 
 async def set_booking_rejected(
-    record: Dict[str, str],
+    record: BookingRecord,
     admin_name: str,
     reason: str,
     *,
     keep_record: bool = True,
-) -> Optional[Dict[str, str]]:
+) -> Optional[BookingRecord]:
     if keep_record:
-        offset = timedelta(hours=3)
-        moscow_tz = timezone(offset, name='МСК')
-        now = datetime.now(moscow_tz)
+        now = datetime.now(MOSCOW_TZ)
 
         return await update_booking(
             record,
             {
                 "Статус": STATUS_REJECTED,
                 "Подтвердил": admin_name,
-                "Подтверждено в": now,
+                "Подтверждено в": now.strftime(DATETIME_FORMAT),
                 "Причина отказа": reason,
             },
         )
@@ -524,7 +1359,7 @@ async def set_booking_rejected(
     return None
 
 
-async def complete_booking(record: Dict[str, str]) -> None:
+async def complete_booking(record: BookingRecord) -> None:
     """
     Завершает запись - удаляет её из таблицы.
     Используется когда стирка завершена.
@@ -540,6 +1375,25 @@ async def complete_booking(record: Dict[str, str]) -> None:
 # Расписание работы
 # -------------------------
 
+async def _load_schedule() -> Dict[int, Tuple[int, int]]:
+    """Loader кеша расписания: разобранный лист Schedule."""
+    sheets = await _load_all_sheets(SCHEDULE_SHEET_NAME)
+    return sheets[SCHEDULE_SHEET_NAME]
+
+
+async def _get_schedule() -> Dict[int, Tuple[int, int]]:
+    """
+    Возвращает расписание работы из кеша или из Google Sheets.
+
+    Returns:
+        Словарь: индекс дня недели -> (час начала, час окончания)
+    """
+    if not await _init_google_sheets():
+        logger.error("Не удалось подключиться к Google Sheets")
+        return {}
+    return await get_cached_schedule(_load_schedule)
+
+
 async def time_of_begining(idx: int) -> Optional[int]:
     """
     Возвращает час начала работы для указанного дня недели.
@@ -551,31 +1405,8 @@ async def time_of_begining(idx: int) -> Optional[int]:
     Returns:
         Час начала работы или None, если день не найден
     """
-    if not await _init_google_sheets():
-        logger.error("Не удалось подключиться к Google Sheets")
-        return None
-
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
-    def loader():
-        return _fetch_records(schedule_sheet)
-
-    records = await get_cached_schedule(with_retries(loader))
-    dict_weekdays = {
-        0: "понедельник",
-        1: "вторник",
-        2: "среда",
-        3: "четверг",
-        4: "пятница",
-        5: "суббота",
-        6: "воскресенье",
-    }
-    target_day = dict_weekdays[idx]
-    for record in records:
-        if record.get("День недели").lower() == target_day:
-            return int(record.get("Начало"))
-    return None
+    hours = (await _get_schedule()).get(idx)
+    return hours[0] if hours else None
 
 
 async def time_of_end(idx: int) -> Optional[int]:
@@ -589,31 +1420,8 @@ async def time_of_end(idx: int) -> Optional[int]:
     Returns:
         Час окончания работы или None, если день не найден
     """
-    if not await _init_google_sheets():
-        logger.error("Не удалось подключиться к Google Sheets")
-        return None
-
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
-    def loader():
-        return _fetch_records(schedule_sheet)
-
-    records = await get_cached_schedule(with_retries(loader))
-    dict_weekdays = {
-        0: "понедельник",
-        1: "вторник",
-        2: "среда",
-        3: "четверг",
-        4: "пятница",
-        5: "суббота",
-        6: "воскресенье",
-    }
-    target_day = dict_weekdays[idx]
-    for record in records:
-        if record.get("День недели").lower() == target_day:
-            return int(record.get("Конец"))
-    return None
+    hours = (await _get_schedule()).get(idx)
+    return hours[1] if hours else None
 
 
 
@@ -621,6 +1429,18 @@ async def time_of_end(idx: int) -> Optional[int]:
 # Чёрный список
 # -------------------------
 
+# Регулярные выражения для извлечения screen_name, компилируются один раз:
+# ссылка на профиль (vk.com, vk.ru и мобильные m.), @упоминание, просто screen_name
+_SCREEN_NAME_PATTERNS = (
+    re.compile(r"(?:https?://)?(?:m\.)?vk\.(?:ru|com)/([^/?&]+)"),
+    re.compile(r"^@([a-zA-Z0-9_.]+)$"),
+    re.compile(r"^([a-zA-Z0-9_.]+)$"),
+)
+# Запрещенные символы в найденном screen_name
+_SCREEN_NAME_FORBIDDEN_RE = re.compile(r"[^\w\.]")
+
+
+@lru_cache(maxsize=1024)
 def extract_screen_name_from_url(url: str) -> Optional[str]:
     """
     Извлекает screen_name из URL VK
@@ -642,22 +1462,15 @@ def extract_screen_name_from_url(url: str) -> Optional[str]:
     """
     # Убираем пробелы и приводим к нижнему регистру
     clean_url = url.strip().lower()
-    
-    # Регулярное выражение для извлечения screen_name
-    patterns = [
-        r'(?:https?://)?(?:m\.)?vk\.(?:ru|com)/([^/?&]+)',  
-        r'^@([a-zA-Z0-9_.]+)$',
-        r'^([a-zA-Z0-9_.]+)$',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, clean_url)
+
+    for pattern in _SCREEN_NAME_PATTERNS:
+        match = pattern.search(clean_url)
         if match:
             screen_name = match.group(1)
             # Проверяем, что screen_name не пустой и не содержит запрещенных символов
-            if screen_name and not re.search(r'[^\w\.]', screen_name):
+            if screen_name and not _SCREEN_NAME_FORBIDDEN_RE.search(screen_name):
                 return screen_name
-    
+
     return None
 
 async def url_to_user_id(url: str, api: API) -> Optional[int]:
@@ -682,23 +1495,46 @@ async def url_to_user_id(url: str, api: API) -> Optional[int]:
     return None
 
 
-async def get_blacklist() -> List[str]:
+async def _load_blacklist() -> Dict[str, int]:
+    """Loader кеша черного списка: ссылка -> номер строки листа Blacklist."""
+    sheets = await _load_all_sheets(BLACKLIST_SHEET_NAME)
+    return sheets[BLACKLIST_SHEET_NAME]
+
+
+async def _get_blacklist_entries() -> Dict[str, int]:
     """
-    Получает черный список из кеша или из Google Sheets.
-    Использует кеширование для оптимизации производительности.
+    Получает черный список вместе с номерами строк из кеша или из Google Sheets.
+
+    Returns:
+        Словарь ссылка -> номер строки
     """
     if not await _init_google_sheets():
         logger.error("Не удалось подключиться к Google Sheets")
-        return []
+        return {}
+    return await get_cached_blacklist(_load_blacklist)
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
 
-    def loader():
-        values = blacklist_sheet.get_all_values()
-        return [row[0] for row in values[1:] if row and row[0].strip()]
+async def _blacklist_link_at(row_number: int) -> Optional[str]:
+    """
+    Читает ссылку из строки листа Blacklist.
+
+    Args:
+        row_number: Номер строки в листе
+
+    Returns:
+        Значение ячейки или None для пустой строки
+    """
+    response = await _request("GET", _values_path(f"{BLACKLIST_SHEET_NAME}!A{row_number}"))
+    values = response.get("values") or [[]]
+    return values[0][0] if values[0] else None
 
-    return await get_cached_blacklist(with_retries(loader))
+
+async def get_blacklist() -> List[str]:
+    """
+    Получает черный список из кеша или из Google Sheets.
+    Использует кеширование для оптимизации производительности.
+    """
+    return list(await _get_blacklist_entries())
 
 
 async def add_blacklist(api: API, user_link: str) -> bool:
@@ -713,18 +1549,23 @@ async def add_blacklist(api: API, user_link: str) -> bool:
         logger.error("Не удалось подключиться к Google Sheets")
         return False
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
     match = await url_to_user_id(user_link, api)
     if not match:
         return False
     vk_link = f"https://vk.com/id{match}"
-    blacklist = await get_blacklist()
-    if vk_link not in blacklist:
-        blacklist_sheet.append_row([vk_link])
-        # Инвалидируем кеш черного списка после добавления
-        await invalidate_blacklist_cache()
+    links = await get_cached_blacklist_links(_load_blacklist)
+    if vk_link in links:
+        return True
+    # Добавляем в множество сразу: параллельное добавление той же ссылки
+    # увидит ее и не запишет строку второй раз
+    links.add(vk_link)
+    try:
+        await _append_row(BLACKLIST_SHEET_NAME, [vk_link])
+    except Exception:
+        links.discard(vk_link)
+        raise
+    # Инвалидируем кеш черного списка после добавления
+    await invalidate_blacklist_cache()
     return True
 
 
@@ -733,14 +1574,20 @@ async def remove_blacklist(user_link: str) -> bool:
         logger.error("Не удалось подключиться к Google Sheets")
         return False
 
-    # Get sheet references
-    list_sheet, blacklist_sheet, schedule_sheet, spreadsheet, drive_service = _get_sheets()
-
-    values = blacklist_sheet.get_all_values()
-    for idx, row in enumerate(values, start=1):
-        if row and row[0] == user_link:
-            blacklist_sheet.delete_rows(idx)
-            # Инвалидируем кеш черного списка после удаления
+    async with _row_guards[BLACKLIST_SHEET_NAME].exclusive():
+        # Номер строки берем из кеша, но перед удалением сверяем ячейку:
+        # если лист меняли в обход бота, кеш перечитывается один раз
+        for _ in range(2):
+            row_number = (await _get_blacklist_entries()).get(user_link)
+            if row_number is None:
+                return False
+            if await _blacklist_link_at(row_number) == user_link:
+                break
             await invalidate_blacklist_cache()
-            return True
-    return False
+        else:
+            logger.warning(f"Строка ссылки {user_link} в черном списке не совпала с листом")
+            return False
+        await _delete_row(BLACKLIST_SHEET_NAME, row_number)
+        # Инвалидируем кеш черного списка после удаления
+        await invalidate_blacklist_cache()
+    return True
@@ -2,9 +2,12 @@
 Модуль обработчиков команд для администраторов.
 Обрабатывает подтверждение/отклонение заявок, блокировку слотов, управление черным списком и т.д.
 """
+import asyncio
+import time
+
 from handlers.role import Role
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 # Настройка Pydantic для работы с vkbottle
 try:
@@ -13,59 +16,91 @@ try:
 except ImportError:
     pass
 
+from vkbottle.api import API
 from vkbottle.bot import Bot, Message, BotLabeler
 
 from config import (
+    ADMIN_IDS,
     DATE_FORMAT,
-    TIME_FORMAT,
+    DATETIME_FORMAT,
+    MOSCOW_TZ,
     format_date_with_weekday,
+    parse_date,
+    parse_time,
     convert_from_format_with_weekday,
 )
 from google_sheets import (
     STATUS_BLOCKED,
     STATUS_CONFIRMED,
+    BookingRecord,
     add_booking,
+    booking_lock,
     complete_booking,
     delete_booking,
     set_booking_confirmed,
     get_admin_blockings,
     get_blacklist,
     get_bookings,
+    get_bookings_page,
     get_pending_bookings,
     is_time_free,
     add_blacklist,
     remove_blacklist,
+    extract_screen_name_from_url,
 )
 from keyboards import (
     admin_menu,
-    pending_decision_keyboard,
+    pending_list_keyboard,
     back_to_menu_keyboard,
     paginate_buttons,
 )
 
 class Admin(Role):
+    # Сколько секунд хранить имя администратора из VK
+    ADMIN_NAME_TTL = 3600
+
+    # ID администратора -> (время получения по time.monotonic, имя и фамилия)
+    _admin_names: Dict[int, Tuple[float, str]] = {}
+
     def __init__(self, bot: Bot):
         self.labeler = BotLabeler()
         self.labeler.vbml_ignore_case = True
         self.register(bot)
         bot.labeler.load(self.labeler)
     
-    def format_booking(self, record: Dict[str, str]) -> str:
+    async def admin_name(self, message: Message) -> str:
+        """Имя и фамилия администратора; users.get вызывается не чаще раза в ADMIN_NAME_TTL."""
+        cached = self._admin_names.get(message.from_id)
+        if cached is not None and time.monotonic() - cached[0] < self.ADMIN_NAME_TTL:
+            return cached[1]
+        admin_info = (await message.ctx_api.users.get(message.from_id))[0]
+        name = f"{admin_info.first_name} {admin_info.last_name}"
+        self._admin_names[message.from_id] = (time.monotonic(), name)
+        return name
+
+    async def preload_admin_names(self, api: API) -> None:
+        """Загружает имена всех администраторов одним запросом users.get при старте."""
+        if not ADMIN_IDS:
+            return
+        try:
+            admins = await api.users.get(user_ids=list(ADMIN_IDS))
+        except Exception as exc:
+            # Не критично: имя будет получено при первом действии администратора
+            self.logger.warning(f"Не удалось получить имена администраторов: {exc}")
+            return
+        now = time.monotonic()
+        for admin_info in admins:
+            self._admin_names[admin_info.id] = (
+                now,
+                f"{admin_info.first_name} {admin_info.last_name}",
+            )
+
+    def format_booking(self, record: BookingRecord) -> str:
         option = record.get("Опция стирки") or "Без добавок"
         return f"{record['Дата']} {record['Время']} — {record['Пользователь']}/{record['Ссылка']} ({option})"
 
     
     def register(self, bot: Bot):
-        admin_commands = {
-            "неподтвержденные",
-            "список записей",
-            "блокировать слот",
-            "разблокировать слот",
-            "черный список",
-            "+ в черный список",
-            "- из черного списка",
-        }
-        
         async def send_user_notification(user_id: str, text: str) -> None:
             """
             Отправляет уведомление пользователю.
@@ -86,7 +121,6 @@ class Admin(Role):
                 self.logger.warning(f"Не удалось отправить уведомление пользователю {user_id}: {exc}")
 
 
-        @self.labeler.private_message(text=["неподтвержденные"], func=self.is_admin)
         async def pending_list(message: Message):
             self.reset_context(message.from_id)
             records = await get_pending_bookings()
@@ -94,31 +128,32 @@ class Admin(Role):
                 await message.answer("📭 Нет заявок, ожидающих подтверждения.")
                 return
             
-            await message.answer(
-                'Если хотите вернуться, нажмите на кнопку "Вернуться в главное меню"',
-                keyboard=back_to_menu_keyboard())
-            
+            # Заявки запоминаются в контексте: кнопки подтверждения/отклонения
+            # ищут запись по номеру строки без повторного запроса
+            self.context[message.from_id] = {
+                "step": "confirm_records",
+                "pending": {str(record["_row"]): record for record in records},
+            }
+            # Все заявки уходят одним-несколькими сообщениями вместо сообщения
+            # на каждую; кнопки заявок - на клавиатуре последнего сообщения
+            entries: List[str] = []
             for record in records:
-                self.reset_context(message.from_id)
-                self.context[message.from_id] = {"step": "confirm_records"}
-                
-                date = format_date_with_weekday(datetime.strptime(record['Дата'], DATE_FORMAT).date())
-                details = (
+                date = format_date_with_weekday(parse_date(record['Дата']))
+                entries.append(
                     f"Заявка №{record['_row']}:\n"
                     f"Дата: {date} {record['Время']}\n"
                     f"Пользователь: {record['Пользователь']} ({record['Ссылка']})\n"
                     f"Опции: {record.get('Опция стирки') or 'Без добавок'}"
                 )
-                await message.answer(
-                    details,
-                    keyboard=pending_decision_keyboard(record["_row"]),
-                )
+            chunks = self.chunk_messages(entries, sep="\n\n")
+            for chunk in chunks[:-1]:
+                await message.answer(chunk)
+            await message.answer(
+                chunks[-1],
+                keyboard=pending_list_keyboard(records),
+            )
                 
         
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "confirm_records"
-            and self.is_admin(m)
-        )
         async def handle_confirm_records(message: Message):
             payload = self.extract_payload(message)
             action = payload.get("action")
@@ -133,22 +168,39 @@ class Admin(Role):
                 )
                 return
             
+            context = self.context[message.from_id]
+            pending = context.get("pending")
+            if pending is None:
+                pending = {str(r["_row"]): r for r in await get_pending_bookings()}
+                context["pending"] = pending
+
+            if action == "paginate":
+                await message.answer(
+                    "Выберите заявку:",
+                    keyboard=pending_list_keyboard(
+                        list(pending.values()), page=payload.get("page", 0)
+                    ),
+                )
+                return
+
             if action == "admin_confirm":
                 row = str(payload.get("row"))
-                record = next(
-                    (r for r in await get_pending_bookings() if str(r["_row"]) == row),
-                    None,
-                )
+                # Подтвержденная заявка убирается из контекста сразу
+                record = pending.pop(row, None)
                 if not record:
                     await message.answer("❌ Заявка уже обработана или не найдена.")
                     return
 
-                admin_info = (await message.ctx_api.users.get(message.from_id))[0]
-                admin_name = f"{admin_info.first_name} {admin_info.last_name}"
+                admin_name = await self.admin_name(message)
                 updated = await set_booking_confirmed(record, admin_name)
                 await message.answer(
                     f"✅ Заявка подтверждена.\n{self.format_booking(updated)}",
-                    keyboard=back_to_menu_keyboard(),
+                    # Оставшиеся заявки остаются на клавиатуре
+                    keyboard=(
+                        pending_list_keyboard(list(pending.values()))
+                        if pending
+                        else back_to_menu_keyboard()
+                    ),
                 )
                 await send_user_notification(
                     updated.get("Пользователь_ID"),
@@ -160,10 +212,7 @@ class Admin(Role):
 
             if action == "admin_reject":
                 row = str(payload.get("row"))
-                record = next(
-                    (r for r in await get_pending_bookings() if str(r["_row"]) == row),
-                    None,
-                )
+                record = pending.get(row)
                 if not record:
                     await message.answer("❌ Заявка уже обработана или не найдена.")
                     return
@@ -179,10 +228,6 @@ class Admin(Role):
                 return
           
             
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "reject_reason"
-            and self.is_admin(m)
-        )
         async def reject_record(message: Message):
             payload = self.extract_payload(message)
             action = payload.get("action")
@@ -206,23 +251,25 @@ class Admin(Role):
             
         async def finalize_rejection(
             message: Message,
-            record: Dict[str, str],
+            record: BookingRecord,
             reason: str,
         ) -> None:
             # Удаляем запись
             updated = await delete_booking(record)
             if updated:
                 display_reason = reason if reason else "не указана"
-                await message.answer(
-                    f"❌ Заявка отклонена. Причина: {display_reason}",
-                    keyboard=admin_menu(),
-                )
-
-                await send_user_notification(
-                    record.get("Пользователь_ID"),
-                    "❌ Ваша запись отклонена.\n"
-                    f"Дата: {record['Дата']} {record['Время']}\n"
-                    f"Причина: {display_reason}",
+                # Ответ администратору и уведомление клиента отправляются одновременно
+                await asyncio.gather(
+                    message.answer(
+                        f"❌ Заявка отклонена. Причина: {display_reason}",
+                        keyboard=admin_menu(),
+                    ),
+                    send_user_notification(
+                        record.get("Пользователь_ID"),
+                        "❌ Ваша запись отклонена.\n"
+                        f"Дата: {record['Дата']} {record['Время']}\n"
+                        f"Причина: {display_reason}",
+                    ),
                 )
 
                 self.reset_context(message.from_id)
@@ -233,52 +280,64 @@ class Admin(Role):
                 )     
 
 
-        @self.labeler.private_message(text=["список записей"], func=self.is_admin)
         async def show_bookings(message: Message):
             self.reset_context(message.from_id)
             # Показываем только подтвержденные записи для завершения
-            bookings = await get_bookings(statuses={STATUS_CONFIRMED})
-
-            if not bookings:
+            await show_confirmed_page(message, 0)
+        
+        
+        async def show_confirmed_page(message: Message, page: int):
+            """
+            Показывает одну страницу подтвержденных записей: из кеша берется
+            и форматируется только она, а в контексте хранятся ее записи.
+            """
+            rows_per_page = 8
+            bookings, total = await get_bookings_page(
+                statuses={STATUS_CONFIRMED},
+                offset=page * rows_per_page,
+                limit=rows_per_page,
+            )
+            if not total:
+                self.reset_context(message.from_id)
                 await message.answer(
                     "Список подтвержденных записей пуст.",
                     keyboard=admin_menu(),
                 )
                 return
+            total_pages = (total + rows_per_page - 1) // rows_per_page  # Округление вверх
+            if not bookings:
+                # Список сократился, пока страница была открыта - показываем последнюю
+                page = total_pages - 1
+                bookings, total = await get_bookings_page(
+                    statuses={STATUS_CONFIRMED},
+                    offset=page * rows_per_page,
+                    limit=rows_per_page,
+                )
             
-            self.reset_context(message.from_id)
             self.context[message.from_id] = {
                 "step": "booking_list",
+                "page": page,
                 "bookings": {str(record["_row"]): record for record in bookings},
             }
             
-            chunks: List[str] = []
-            current_chunk: List[str] = []
-            
-            for record in bookings:
-                entry = self.format_booking(record)
-                current_chunk.append(entry)
-                if len("\n".join(current_chunk)) > 3500:
-                    chunks.append("\n".join(current_chunk))
-                    current_chunk = []
-            if current_chunk:
-                chunks.append("\n".join(current_chunk))
-            
-            for i, chunk in enumerate(chunks):
-                if i == len(chunks) - 1:
-                    # Последний чанк с клавиатурой
-                    await message.answer(
-                        f"📋 Подтвержденные записи (выберите для завершения):\n{chunk}",
-                        keyboard=paginate_buttons(bookings, target="record", buttons_per_row=1, rows_per_page=8),
-                    )
-                else:
-                    await message.answer(f"📋 Записи:\n{chunk}")
+            chunks = self.chunk_messages([self.format_booking(record) for record in bookings])
+            for chunk in chunks[:-1]:
+                await message.answer(f"📋 Записи:\n{chunk}")
+            # Последний чанк с клавиатурой
+            await message.answer(
+                f"📋 Подтвержденные записи (страница {page + 1} из {total_pages}, "
+                f"выберите для завершения):\n{chunks[-1]}",
+                keyboard=paginate_buttons(
+                    bookings,
+                    target="record",
+                    page=page,
+                    buttons_per_row=1,
+                    rows_per_page=rows_per_page,
+                    total=total,
+                ),
+            )
         
         
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "booking_list"
-            and self.is_admin(m)
-        )
         async def handle_booking_list_selection(message: Message, page: int = 0):            
             payload = self.extract_payload(message)
             action = payload.get("action")
@@ -293,69 +352,44 @@ class Admin(Role):
                 )
                 return
 
-            bookings = self.context.get("bookings")
-            if bookings is None:
-                bookings = await get_bookings(statuses={STATUS_CONFIRMED})
-                self.context[message.from_id]["bookings"] = bookings
-            
             if action == "paginate":
-                context = self.context.get(message.from_id, {})
-                context["bookings"] = bookings
-                self.context[message.from_id] = context
-                
-                await show_booking_page(message, bookings, payload.get("page", 0))
+                await show_confirmed_page(message, payload.get("page", 0))
                 return
             
             if action != "select":
-                chunks: List[str] = []
-                current_chunk: List[str] = []
-                
-                for record in bookings:
-                    entry = self.format_booking(record)
-                    current_chunk.append(entry)
-                    if len("\n".join(current_chunk)) > 3500:
-                        chunks.append("\n".join(current_chunk))
-                        current_chunk = []
-                if current_chunk:
-                    chunks.append("\n".join(current_chunk))
-                
-                for i, chunk in enumerate(chunks):
-                    if i == len(chunks) - 1:
-                        # Последний чанк с клавиатурой
-                        await message.answer(
-                            f"❌ Пожалуйста, выберите подтвержденные записи с клавиатуры!\n(выберите для завершения):\n{chunk}",
-                            keyboard=paginate_buttons(bookings, target="record", buttons_per_row=1, rows_per_page=8),
-                        )
-                    else:
-                        await message.answer(f"📋 Записи:\n{chunk}")
-                
+                await message.answer("❌ Пожалуйста, выберите подтвержденную запись с клавиатуры!")
+                await show_confirmed_page(
+                    message, self.context[message.from_id].get("page", 0)
+                )
                 return
             
-            row_key = str(payload.get("row"))
-            target_booking = None
-            for booking in bookings:
-                if str(booking.get("_row")) == row_key:
-                    target_booking = booking
-                    break
+            # Записи текущей страницы берем из контекста, сохраненного
+            # show_confirmed_page; если его нет - ищем по всем подтвержденным
+            by_row = self.context[message.from_id].get("bookings")
+            if by_row is None:
+                by_row = {
+                    str(record["_row"]): record
+                    for record in await get_bookings(statuses={STATUS_CONFIRMED})
+                }
+            target_booking = by_row.get(str(payload.get("row")))
             
             if not target_booking:
                 self.reset_context(message.from_id)
                 await message.answer("Не удалось найти запись. Попробуйте снова.")
                 return
             
-            user_id = target_booking.get("Пользователь_ID")
-            if user_id:
-                try:
-                    await send_user_notification(
-                        user_id,
-                        f"✅ Ваша стирка завершена!\n"
-                        f"Дата: {target_booking['Дата']} {target_booking['Время']}\n"
-                        f"Спасибо, что воспользовались нашими услугами!",
-                    )
-                except Exception as exc:
-                    self.logger.warning(f"Не удалось отправить уведомление пользователю {user_id}: {exc}")
-        
-            await complete_booking(target_booking)
+            # Уведомление клиента (VK API) и удаление записи (Google Sheets)
+            # независимы, поэтому выполняются одновременно. Ошибки отправки
+            # send_user_notification логирует сама
+            await asyncio.gather(
+                send_user_notification(
+                    target_booking.get("Пользователь_ID"),
+                    f"✅ Ваша стирка завершена!\n"
+                    f"Дата: {target_booking['Дата']} {target_booking['Время']}\n"
+                    f"Спасибо, что воспользовались нашими услугами!",
+                ),
+                complete_booking(target_booking),
+            )
             self.reset_context(message.from_id)
             
             await message.answer(
@@ -374,14 +408,10 @@ class Admin(Role):
             
             await message.answer(text, keyboard=keyboard)
             
-            # Обновляем контекст
-            context = self.context.get(message.from_id, {})
-            context["bookings"] = all_bookings
-            context["page"] = page
-            self.context[message.from_id] = context
+            # Обновляем контекст; записи по номерам строк в нем уже есть
+            self.context[message.from_id]["page"] = page
 
 
-        @self.labeler.private_message(text=["блокировать слот"], func=self.is_admin)
         async def start_block_slot(message: Message):
             self.reset_context(message.from_id)
             self.context[message.from_id] = {"step": "block_date"}
@@ -391,9 +421,6 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "block_date"
-        )
         async def handle_block_date(message: Message):
             payload = self.extract_payload(message)
             action = payload.get("action")
@@ -444,10 +471,6 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "block_time"
-            and self.is_admin(m)
-        )
         async def handle_block_time(message: Message):
             context = self.context.get(message.from_id)
             payload = self.extract_payload(message)
@@ -495,7 +518,7 @@ class Admin(Role):
                 time_text = message.text.strip()
 
             try:
-                datetime.strptime(time_text, TIME_FORMAT)
+                parse_time(time_text)
             except ValueError:
                 _, keyboard = await self.time_keyboard(selected_date=selected_date)
                 await message.answer(
@@ -504,25 +527,28 @@ class Admin(Role):
                 )
                 return
 
-            if not await is_time_free(selected_date, time_text):
+            # Проверка слота и блокировка - под общей блокировкой записи
+            async with booking_lock:
+                slot_free = await is_time_free(selected_date, time_text)
+                if slot_free:
+                    await add_booking(
+                        user_name="Блокировка администратора",
+                        user_link="admin_blocked",
+                        date=datetime.strftime(selected_date, DATE_FORMAT),
+                        time_slot=time_text,
+                        user_id=None,
+                        status=STATUS_BLOCKED,
+                        wash_option="Блокировка",
+                        confirmed_by="Администратор",
+                        confirmed_at=datetime.now(MOSCOW_TZ).strftime(DATETIME_FORMAT),
+                    )
+            if not slot_free:
                 _, keyboard = await self.time_keyboard(selected_date=selected_date)
                 await message.answer(
                     "❌ Слот уже занят или забронирован.",
                     keyboard=keyboard,
                 )
                 return
-
-            await add_booking(
-                user_name="Блокировка администратора",
-                user_link="admin_blocked",
-                date=datetime.strftime(selected_date, DATE_FORMAT),
-                time_slot=time_text,
-                user_id=None,
-                status=STATUS_BLOCKED,
-                wash_option="Блокировка",
-                confirmed_by="Администратор",
-                confirmed_at=datetime.utcnow().isoformat(),
-            )
             self.reset_context(message.from_id)
             await message.answer(
                 f"✅ Слот {format_date_with_weekday(selected_date)} {time_text} заблокирован.",
@@ -530,7 +556,6 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(text=["разблокировать слот"], func=self.is_admin)
         async def start_unblock(message: Message):
             self.reset_context(message.from_id)
             bookings = await get_admin_blockings()
@@ -547,10 +572,6 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "unblock_select"
-            and self.is_admin(m)
-        )
         async def handle_unblock_selection(message: Message, page: int = 0):
             payload = self.extract_payload(message)
             action = payload.get("action")
@@ -565,27 +586,28 @@ class Admin(Role):
                 )
                 return
 
-            bookings = await get_admin_blockings()
+            # Блокировки берем из контекста, сохраненного start_unblock,
+            # и запрашиваем только если его нет
+            context = self.context[message.from_id]
+            by_row = context.get("bookings")
+            if by_row is None:
+                by_row = {str(record["_row"]): record for record in await get_admin_blockings()}
+                context["bookings"] = by_row
+            bookings = list(by_row.values())
             
             if action == "paginate":
-                context = self.context.get(message.from_id, {})
-                context["bookings"] = bookings
-                self.context[message.from_id] = context
-                
                 await show_booking_page(message, bookings, payload.get("page", 0))
                 return
             
-            context = self.context.get(message.from_id, {})
             if action != "select":
-                blockings = bookings
                 await message.answer(
                     "Используйте кнопки клавиатуры, чтобы выбрать слот.",
-                    keyboard=paginate_buttons(blockings),
+                    keyboard=paginate_buttons(bookings, target="record", buttons_per_row=1),
                 )
                 return
 
             row_key = str(payload.get("row"))
-            record = context.get("bookings", {}).get(row_key)
+            record = by_row.get(row_key)
             if not record:
                 self.reset_context(message.from_id)
                 await message.answer("Не удалось найти слот. Попробуйте снова.")
@@ -608,25 +630,21 @@ class Admin(Role):
             
             await message.answer(text, keyboard=keyboard)
             
-            # Обновляем контекст
-            context = self.context.get(message.from_id, {})
-            context["bookings"] = all_bookings
-            context["page"] = page
-            self.context[message.from_id] = context
+            # Обновляем контекст; блокировки по номерам строк в нем уже есть
+            self.context[message.from_id]["page"] = page
 
 
-        @self.labeler.private_message(text=["черный список"], func=self.is_admin)
         async def request_blacklist(message: Message):
             self.reset_context(message.from_id)
             blacklist = await get_blacklist()
             if blacklist:
-                for user in blacklist:
-                    await message.answer(user)
+                # Одно сообщение на ~3500 символов вместо сообщения на каждую ссылку
+                for chunk in self.chunk_messages(blacklist):
+                    await message.answer(chunk)
             else:
                 await message.answer("Черный список пуст")
 
 
-        @self.labeler.private_message(text=["+ в черный список"], func=self.is_admin)
         async def request_blacklist_add(message: Message):
             self.reset_context(message.from_id)
             self.context[message.from_id] = {"step": "blacklist_add"}
@@ -636,7 +654,6 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(text=["- из черного списка"], func=self.is_admin)
         async def request_blacklist_remove(message: Message):
             self.reset_context(message.from_id)
             self.context[message.from_id] = {"step": "blacklist_remove"}
@@ -646,16 +663,9 @@ class Admin(Role):
             )
 
 
-        @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step")
-            in {"blacklist_add", "blacklist_remove"}
-            and self.is_admin(m)
-        )
         async def handle_blacklist_input(message: Message):
             payload = self.extract_payload(message)
             action = payload.get("action")
-            if not action:
-                return
             
             if action == "back_to_menu":
                 self.reset_context(message.from_id)
@@ -665,9 +675,16 @@ class Admin(Role):
                 )
                 return
             
-            step = self.context.get(message.from_id, {}).get("step")
-            link = message.text
+            step = self.current_step(message.from_id)
+            link = (message.text or "").strip()
             if step == "blacklist_add":
+                # Ссылку неверного формата отклоняем сразу, без запроса к VK API
+                if extract_screen_name_from_url(link) is None:
+                    await message.answer(
+                        "❌ Неверный формат ссылки. Пример: https://vk.com/id123",
+                        keyboard=back_to_menu_keyboard(),
+                    )
+                    return
                 if await add_blacklist(bot.api, link):
                     self.reset_context(message.from_id)
                     await message.answer(
@@ -697,13 +714,49 @@ class Admin(Role):
                     "Сессия истекла. Начните заново.",
                     keyboard=admin_menu(),
                 )
-        
-        
-        @self.labeler.private_message(
-            func=lambda m: self.is_admin(m)
-            and not self.context.get(m.from_id, {}).get("step")
-            and not self.extract_payload(m)
-            and self.normalize(m.text) not in admin_commands
-        )
+
+
         async def admin_fallback(message: Message):
-            await message.answer("Админ меню:", keyboard=admin_menu())
\ No newline at end of file
+            await message.answer("Админ меню:", keyboard=admin_menu())
+
+
+        # Команды меню и шаги диалога - словари, поэтому обработчик для
+        # сообщения находится одним поиском, без перебора правил vkbottle.
+        # Число - место правила в прежнем порядке регистрации: если подошли
+        # и команда, и шаг, срабатывает то, что было зарегистрировано раньше
+        text_handlers = {
+            "неподтвержденные": (0, pending_list),
+            "список записей": (3, show_bookings),
+            "блокировать слот": (5, start_block_slot),
+            "разблокировать слот": (8, start_unblock),
+            "черный список": (10, request_blacklist),
+            "+ в черный список": (10, request_blacklist_add),
+            "- из черного списка": (10, request_blacklist_remove),
+        }
+        step_handlers = {
+            "confirm_records": (1, handle_confirm_records),
+            "reject_reason": (2, reject_record),
+            "booking_list": (4, handle_booking_list_selection),
+            "block_date": (6, handle_block_date),
+            "block_time": (7, handle_block_time),
+            "unblock_select": (9, handle_unblock_selection),
+            "blacklist_add": (11, handle_blacklist_input),
+            "blacklist_remove": (11, handle_blacklist_input),
+        }
+
+        @self.labeler.private_message(func=self.is_admin)
+        async def admin_dispatch(message: Message):
+            step = self.current_step(message.from_id)
+            matches = [
+                match
+                for match in (
+                    text_handlers.get(self.normalize(message.text)),
+                    step_handlers.get(step) if step else None,
+                )
+                if match is not None
+            ]
+            if matches:
+                _, handler = min(matches, key=lambda match: match[0])
+                await handler(message)
+            elif not step and not self.extract_payload(message):
+                await admin_fallback(message)
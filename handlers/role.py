@@ -1,16 +1,22 @@
 import json
 import logging
-from collections import defaultdict
-from datetime import datetime, timedelta, timezone 
-from typing import Any, Dict, List, Optional
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from cachetools import TTLCache
 from vkbottle.bot import Message, BotLabeler, Bot
 
 from config import (
     ADMIN_IDS,
+    CONTEXT_MAXSIZE,
+    CONTEXT_TTL,
+    MOSCOW_TZ,
     SLOT_INTERVAL_MIN,
     format_date_with_weekday,
 )
 from google_sheets import (
+    BookingRecord,
     get_bookings,
     time_of_begining,
     time_of_end,
@@ -21,13 +27,56 @@ from keyboards import(
     paginate_buttons,
 )
 
+# Слоты зависят только от SLOT_INTERVAL_MIN - строим их один раз при импорте
+_ALL_TIME_SLOTS: Tuple[str, ...] = tuple(
+    f"{minutes // 60:02d}:{minutes % 60:02d}"
+    for minutes in range(0, 24 * 60, SLOT_INTERVAL_MIN)
+)
+
+
+# Окно дат для записи: (дата вычисления, даты окна)
+_date_window: Optional[Tuple[datetime.date, List[datetime.date]]] = None
+
+
+@lru_cache(maxsize=32)
+def _working_slots(start_hour: int, end_hour: int) -> Tuple[Tuple[str, ...], Tuple[int, ...]]:
+    """
+    Слоты рабочего дня с start_hour до end_hour и их начало в минутах от полуночи.
+    Расписание читается из таблицы, поэтому кешируем по часам работы, а не по дню
+    недели: после изменения расписания просто используется другая запись кеша.
+    """
+    minutes = tuple(
+        m for m in range(0, 24 * 60, SLOT_INTERVAL_MIN) if start_hour <= m // 60 < end_hour
+    )
+    return tuple(f"{m // 60:02d}:{m % 60:02d}" for m in minutes), minutes
+
+
+class _ContextCache(TTLCache):
+    """
+    Контексты диалогов с вытеснением: неактивный дольше CONTEXT_TTL контекст
+    удаляется, число хранимых ограничено CONTEXT_MAXSIZE. Как и defaultdict,
+    для отсутствующего ключа создает пустой словарь; каждое обращение
+    продлевает срок жизни контекста.
+    """
+
+    def __missing__(self, key: int) -> Dict[str, Any]:
+        value: Dict[str, Any] = {}
+        self[key] = value
+        return value
+
+    def __getitem__(self, key: int) -> Dict[str, Any]:
+        value = super().__getitem__(key)
+        self[key] = value
+        return value
+
+
 class Role():
     
     logger = logging.getLogger(__name__)
     
     commands = {}
     
-    context: Dict[int, Dict[str, Any]] = defaultdict(dict)
+    context: Dict[int, Dict[str, Any]] = _ContextCache(maxsize=CONTEXT_MAXSIZE, ttl=CONTEXT_TTL)
       
     def extract_payload(self, message: Message) -> Dict[str, Any]:
         payload = message.payload
@@ -54,16 +103,38 @@ class Role():
     def reset_context(self, id: int) -> None:
         self.context.pop(id, None)
 
-    def all_time_slots(self) -> List[str]:
-        return [
-            f"{minutes // 60:02d}:{minutes % 60:02d}"
-            for minutes in range(0, 24 * 60, SLOT_INTERVAL_MIN)
-        ]
+    def current_step(self, id: int) -> Optional[str]:
+        """Текущий шаг диалога пользователя без создания пустого контекста."""
+        context = self.context.get(id)
+        return context.get("step") if context else None
+
+    def chunk_messages(self, entries: List[str], sep: str = "\n", limit: int = 3500) -> List[str]:
+        """
+        Склеивает строки в сообщения не длиннее limit символов,
+        чтобы отправить список несколькими сообщениями вместо одного на строку.
+        """
+        chunks: List[str] = []
+        current: List[str] = []
+        length = 0
+        for entry in entries:
+            added = len(entry) + (len(sep) if current else 0)
+            if current and length + added > limit:
+                chunks.append(sep.join(current))
+                current, length = [], 0
+                added = len(entry)
+            current.append(entry)
+            length += added
+        if current:
+            chunks.append(sep.join(current))
+        return chunks
+
+    def all_time_slots(self) -> Tuple[str, ...]:
+        return _ALL_TIME_SLOTS
 
     async def free_times_for_date(
         self,
         selected_date: datetime.date,
-        active_bookings: Optional[List[Dict[str, str]]] = None,
+        active_bookings: Optional[List[BookingRecord]] = None,
     ) -> List[str]:
         if active_bookings is None:
             bookings = await get_bookings(date=selected_date, statuses=ACTIVE_STATUSES)
@@ -74,54 +145,37 @@ class Role():
             ]
         existing = {booking["Время"] for booking in bookings}
 
-        offset = timedelta(hours=3)
-        dt = timezone(offset, name='МСК')
-        now = datetime.now(dt)
-        
-        slots: List[str] = []
-        
-        # Определяем время начала в зависимости от дня недели
+        # Определяем время работы в зависимости от дня недели
         # 0 = понедельник, 6 = воскресенье
         current_weekday = selected_date.weekday()
-
-        # Начальное время
         start_hour = await time_of_begining(current_weekday)
+        end_hour = await time_of_end(current_weekday)
+        if start_hour is None or end_hour is None:
+            # Дня нет в расписании - свободных слотов нет
+            return []
 
-        # Конечное время
-        end_hour = await time_of_end(current_weekday) 
-        
-        
-        for time_slot in self.all_time_slots():
-            # Пропускаем слоты до начала рабочего времени
-            slot_hour = int(time_slot[:2])
-            if slot_hour < start_hour:
-                continue
-            
-            # Пропускаем слоты после окончания рабочего времени
-            if slot_hour >= end_hour:
-                continue
-                
-            if time_slot in existing:
-                continue
-                
-            # Проверяем, не прошел ли уже временной слот для текущей даты
-            if selected_date == now.date():
-                slot_minutes = int(time_slot[:2]) * 60 + int(time_slot[3:])
-                current_minutes = now.hour * 60 + now.minute
-                if slot_minutes <= current_minutes:
-                    continue
-                    
-            slots.append(time_slot)
-            
-        return slots
+        day_slots, day_minutes = _working_slots(start_hour, end_hour)
+
+        # Для текущей даты отбрасываем уже прошедшие слоты
+        first = 0
+        now = datetime.now(MOSCOW_TZ)
+        if selected_date == now.date():
+            first = bisect_right(day_minutes, now.hour * 60 + now.minute)
+
+        return [slot for slot in day_slots[first:] if slot not in existing]
 
     def booking_window_dates(self) -> List[datetime.date]:
+        # Окно меняется только со сменой даты - пересчитываем раз в день.
+        # Список общий для всех вызовов, изменять его нельзя
+        global _date_window
         today = datetime.today().date()
-        start_of_week = today - timedelta(days=today.weekday())
-        dates = [start_of_week + timedelta(days=i) for i in range(14)]
-        return [date for date in dates if date >= today]
+        if _date_window is None or _date_window[0] != today:
+            start_of_week = today - timedelta(days=today.weekday())
+            dates = [start_of_week + timedelta(days=i) for i in range(14)]
+            _date_window = (today, [date for date in dates if date >= today])
+        return _date_window[1]
 
-    async def available_dates(self, active_bookings: List[Dict[str, str]]) -> List[datetime.date]:
+    async def available_dates(self, active_bookings: List[BookingRecord]) -> List[datetime.date]:
         dates = []
         for date in self.booking_window_dates():
             if await self.free_times_for_date(date, active_bookings):
@@ -131,7 +185,7 @@ class Role():
     async def date_keyboard(
         self,
         page: int = 0,
-        active_bookings: Optional[List[Dict[str, str]]] = None,
+        active_bookings: Optional[List[BookingRecord]] = None,
     ):
         dates = self.booking_window_dates()
         dates = [
@@ -151,7 +205,7 @@ class Role():
     async def time_keyboard(
         self,
         selected_date: datetime.date,
-        active_bookings: Optional[List[Dict[str, str]]] = None,
+        active_bookings: Optional[List[BookingRecord]] = None,
         page: int = 0,
     ):
         free_times = await self.free_times_for_date(selected_date, active_bookings)
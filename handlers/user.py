@@ -3,8 +3,8 @@
 Обрабатывает запись на стирку, просмотр записей, отмену и другие действия пользователей.
 """
 from handlers.role import Role
-from datetime import datetime, timezone, timedelta
-from typing import Dict, List
+from datetime import datetime
+from typing import List
 
 # Настройка Pydantic для работы с vkbottle
 try:
@@ -20,17 +20,21 @@ from config import (
     ADMIN_IDS,
     MAX_SLOTS_PER_DAY,
     DATE_FORMAT,
-    TIME_FORMAT,
     DATETIME_FORMAT,
+    MOSCOW_TZ,
     WASH_OPTIONS,
     WASH_PRICES,
     format_date_with_weekday,
+    parse_date,
+    parse_time,
     convert_from_format_with_weekday,
 )
 from google_sheets import (
     ACTIVE_STATUSES,
     STATUS_PENDING,
+    BookingRecord,
     add_booking,
+    booking_lock,
     delete_booking,
     get_blacklist,
     get_bookings,
@@ -52,9 +56,9 @@ class User(Role):
         self.register(bot)
         bot.labeler.load(self.labeler)
     
-    def format_booking(self, record: Dict[str, str]) -> str:
+    def format_booking(self, record: BookingRecord) -> str:
         option = record.get("Опция стирки") or "Без добавок"
-        return f"{format_date_with_weekday(datetime.strptime(record['Дата'], DATE_FORMAT))} {record['Время']} — ({option})"
+        return f"{format_date_with_weekday(parse_date(record['Дата']))} {record['Время']} — ({option})"
 
     def register(self, bot: Bot):
         user_commands = [
@@ -105,7 +109,7 @@ class User(Role):
             )
 
         @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "choose_date"
+            func=lambda m: self.current_step(m.from_id) == "choose_date"
             and self.is_user(m)
         )
         async def handle_date(message: Message):
@@ -177,7 +181,7 @@ class User(Role):
             )
 
         @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "choose_time"
+            func=lambda m: self.current_step(m.from_id) == "choose_time"
             and self.is_user(m)
         )
         async def handle_time(message: Message):
@@ -232,7 +236,7 @@ class User(Role):
                 time_text = message.text.strip()
 
             try:
-                datetime.strptime(time_text, TIME_FORMAT)
+                parse_time(time_text)
             except ValueError:
                 _, keyboard = await self.time_keyboard(selected_date=selected_date)
                 await message.answer(
@@ -271,7 +275,7 @@ class User(Role):
             )
 
         @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "choose_options"
+            func=lambda m: self.current_step(m.from_id) == "choose_options"
             and self.is_user(m)
         )
         async def handle_options(message: Message):
@@ -349,14 +353,6 @@ class User(Role):
                 return
 
             time_text = context["time"]
-            if not await is_time_free(selected_date, time_text):
-                self.reset_context(message.from_id)
-                await message.answer(
-                    "❌ Пока вы выбирали опции, слот заняли. Попробуйте снова.",
-                    keyboard=user_menu(),
-                )
-                return
-
             vk_user = (await message.ctx_api.users.get(message.from_id))[0]
             full_name = f"{vk_user.first_name} {vk_user.last_name}"
             user_link = f"https://vk.com/id{message.from_id}"
@@ -364,15 +360,27 @@ class User(Role):
             wash_option = ", ".join(selected_options) if selected_options else "Без добавок"
             price = context["price"]
 
-            await add_booking(
-                user_name=full_name,
-                user_link=user_link,
-                date=datetime.strftime(selected_date, DATE_FORMAT),
-                time_slot=time_text,
-                user_id=message.from_id,
-                status=STATUS_PENDING,
-                wash_option=wash_option,
-            )
+            # Проверка слота и запись - под общей блокировкой, иначе два
+            # пользователя могут одновременно записаться на одно время
+            async with booking_lock:
+                slot_free = await is_time_free(selected_date, time_text)
+                if slot_free:
+                    await add_booking(
+                        user_name=full_name,
+                        user_link=user_link,
+                        date=datetime.strftime(selected_date, DATE_FORMAT),
+                        time_slot=time_text,
+                        user_id=message.from_id,
+                        status=STATUS_PENDING,
+                        wash_option=wash_option,
+                    )
+            if not slot_free:
+                self.reset_context(message.from_id)
+                await message.answer(
+                    "❌ Пока вы выбирали опции, слот заняли. Попробуйте снова.",
+                    keyboard=user_menu(),
+                )
+                return
 
             admin_message = (
                 "🆕 Новая заявка на стирку\n"
@@ -427,7 +435,7 @@ class User(Role):
             )
 
         @self.labeler.private_message(
-            func=lambda m: self.context.get(m.from_id, {}).get("step") == "cancel_select"
+            func=lambda m: self.current_step(m.from_id) == "cancel_select"
             and self.is_user(m)
         )
         async def handle_cancel_selection(message: Message, page: int = 0):
@@ -473,13 +481,11 @@ class User(Role):
                 )
                 return
 
-            offset = timedelta(hours=3)
-            moscow_tz = timezone(offset, name='МСК')
-            now = datetime.now(moscow_tz)
+            now = datetime.now(MOSCOW_TZ)
             record_datetime = datetime.strptime(
                 f"{record['Дата']} {record['Время']}",
                 DATETIME_FORMAT
-            ).replace(tzinfo=moscow_tz)
+            ).replace(tzinfo=MOSCOW_TZ)
             record_datetime_str = datetime.strftime(record_datetime, DATETIME_FORMAT)
             
             diff_time = record_datetime - now
@@ -557,10 +563,12 @@ class User(Role):
             )
 
         @self.labeler.private_message(
+            # Дешевые проверки идут первыми; JSON payload разбирается,
+            # только если он вообще есть у сообщения
             func=lambda m: self.is_user(m)
-            and not self.context.get(m.from_id, {}).get("step")
-            and not self.extract_payload(m)
+            and not self.current_step(m.from_id)
             and self.normalize(m.text) not in user_commands
+            and (not m.payload or not self.extract_payload(m))
         )
         async def fallback(message: Message):
             await message.answer(
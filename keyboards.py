@@ -2,19 +2,23 @@
 Модуль для генерации клавиатур VK Bot.
 Содержит функции для создания различных типов клавиатур: главное меню, опции стирки, пагинация и т.д.
 """
-from typing import Iterable, Sequence
+from functools import lru_cache
+from typing import Iterable, Optional, Sequence
 
 from vkbottle import Keyboard, Text
 
 from config import WASH_PRICES
 
 
-def user_menu() -> Keyboard:
+# Клавиатуры без параметров - константы: JSON собирается один раз и
+# переиспользуется (строка неизменяема, vkbottle принимает её как есть)
+@lru_cache(maxsize=None)
+def user_menu() -> str:
     """
     Создает главное меню для пользователя или администратора.
         
     Returns:
-        Keyboard объект с кнопками юзер-меню
+        JSON клавиатуры с кнопками юзер-меню
     """
 
     keyboard = Keyboard(one_time=False, inline=False)
@@ -23,15 +27,16 @@ def user_menu() -> Keyboard:
     keyboard.row()
     keyboard.add(Text("Отменить запись"))
     keyboard.add(Text("Связаться с админом"))
-    return keyboard
+    return keyboard.get_json()
 
 
-def admin_menu() -> Keyboard:
+@lru_cache(maxsize=None)
+def admin_menu() -> str:
     """
     Создает меню администратора с опциями управления записями.
     
     Returns:
-        Keyboard объект с кнопками админ-меню
+        JSON клавиатуры с кнопками админ-меню
     """
     keyboard = Keyboard(one_time=False, inline=False)
     keyboard.add(Text("Неподтвержденные"))
@@ -44,7 +49,7 @@ def admin_menu() -> Keyboard:
     keyboard.row()
     keyboard.add(Text("+ в черный список"))
     keyboard.add(Text("- из черного списка"))
-    return keyboard
+    return keyboard.get_json()
 
 
 def wash_options_keyboard(
@@ -93,7 +98,8 @@ def wash_options_keyboard(
     return keyboard
 
 
-def choice_keyboard(arg_main: str|None, arg_confirm: str|None, arg_reject: str|None, ):
+@lru_cache(maxsize=32)
+def choice_keyboard(arg_main: str|None, arg_confirm: str|None, arg_reject: str|None, ) -> str:
     
     keyboard = Keyboard(one_time=False, inline=False)
     keyboard.add(Text("✅ Подтвердить", payload={"step": arg_confirm, "action": "confirm"}))
@@ -101,40 +107,62 @@ def choice_keyboard(arg_main: str|None, arg_confirm: str|None, arg_reject: str|N
     keyboard.row()
     keyboard.add(Text("Вернуться в главное меню", payload={"step": arg_main, "action": "back_to_menu"}))
     
-    return keyboard
+    return keyboard.get_json()
 
 
-def back_to_menu_keyboard():
+@lru_cache(maxsize=None)
+def back_to_menu_keyboard() -> str:
     
     keyboard = Keyboard(one_time=False, inline=False)
     keyboard.add(Text("Вернуться в главное меню", payload={"action": "back_to_menu"}))
     
-    return keyboard
+    return keyboard.get_json()
 
 
-def pending_decision_keyboard(row: int) -> Keyboard:
+def pending_list_keyboard(
+    records: Sequence[dict],
+    page: int = 0,
+    rows_per_page: int = 8,
+) -> Keyboard:
     """
-    Создает клавиатуру для подтверждения/отклонения заявки администратором.
-    
+    Создает клавиатуру со списком заявок: по строке с кнопками
+    подтверждения/отклонения на каждую заявку, с пагинацией.
+
     Args:
-        row: Номер строки записи в таблице
-        
+        records: Заявки, ожидающие подтверждения
+        page: Номер страницы (с нуля)
+        rows_per_page: Количество заявок на странице
+
     Returns:
-        Keyboard объект с кнопками подтверждения/отклонения
+        Keyboard объект с кнопками заявок
     """
-    keyboard = Keyboard(inline=True)
-    keyboard.add(
-        Text(
-            "✅ Подтвердить",
-            payload={"action": "admin_confirm", "row": row},
+    start_idx = page * rows_per_page
+    end_idx = start_idx + rows_per_page
+
+    keyboard = Keyboard(one_time=False, inline=False)
+    for record in records[start_idx:end_idx]:
+        row = record["_row"]
+        keyboard.add(
+            Text(f"✅ №{row}", payload={"action": "admin_confirm", "row": row})
+        )
+        keyboard.add(
+            Text(f"❌ №{row}", payload={"action": "admin_reject", "row": row})
+        )
+        keyboard.row()
+
+    has_prev = start_idx > 0
+    has_next = end_idx < len(records)
+    if has_prev:
+        keyboard.add(
+            Text("← Предыдущие", payload={"action": "paginate", "page": page - 1})
         )
-    )
-    keyboard.add(
-        Text(
-            "❌ Отклонить",
-            payload={"action": "admin_reject", "row": row},
+    if has_next:
+        keyboard.add(
+            Text("Следующие →", payload={"action": "paginate", "page": page + 1})
         )
-    )
+    if has_prev or has_next:
+        keyboard.row()
+    keyboard.add(Text("Вернуться в главное меню", payload={"action": "back_to_menu"}))
     return keyboard
 
 
@@ -144,6 +172,7 @@ def paginate_buttons(
     page: int = 0,
     buttons_per_row: int = 4,
     rows_per_page: int = 10,
+    total: Optional[int] = None,
 ) -> Keyboard:
     """
     Генерирует клавиатуру VK с пагинацией.
@@ -153,10 +182,15 @@ def paginate_buttons(
     :param page: Номер страницы (с нуля)
     :param buttons_per_row: Количество кнопок в строке
     :param rows_per_page: Количество строк на странице
+    :param total: Общее число элементов, если items - уже выбранная страница
     """
     start_idx = page * buttons_per_row * rows_per_page
     end_idx = start_idx + buttons_per_row * rows_per_page
-    page_items = items[start_idx:end_idx]
+    if total is None:
+        page_items = items[start_idx:end_idx]
+        total = len(items)
+    else:
+        page_items = items
 
     keyboard = Keyboard(one_time=True, inline=False)
     for idx, item in enumerate(page_items):
@@ -175,7 +209,7 @@ def paginate_buttons(
             keyboard.row()
 
     has_prev = start_idx > 0
-    has_next = end_idx < len(items)
+    has_next = end_idx < total
 
     if has_prev or has_next:
         keyboard.row()
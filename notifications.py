@@ -1,24 +1,30 @@
 """
 Модуль для обработки уведомлений о стирках.
 Отправляет уведомления пользователям и админам о предстоящих и завершенных стирках.
+Напоминания планируются по куче (heapq) с ближайшим временем отправки:
+цикл спит до ближайшего напоминания или до изменения бронирований.
 """
 import asyncio
-import datetime
+import heapq
 import logging
-from typing import Optional
-from datetime import datetime, timedelta, timezone
+import time
+from typing import List, Optional, Set, Tuple
+from datetime import datetime, timedelta
 
 from vkbottle.bot import Bot
 
-from cache import get_cache
+from cache import add_bookings_listener, get_cache
 from config import (
     ADMIN_IDS,
     NOTIFY_AFTER_MIN,
     NOTIFY_BEFORE_MIN,
-    DATETIME_FORMAT
+    DATE_FORMAT,
+    DATETIME_FORMAT,
+    MOSCOW_TZ,
 )
 from google_sheets import (
     STATUS_CONFIRMED,
+    BookingRecord,
     check_sheet_changes,
     complete_booking,
     get_bookings
@@ -26,6 +32,19 @@ from google_sheets import (
 
 logger = logging.getLogger(__name__)
 
+# Сколько секунд после запланированного момента напоминание еще актуально
+NOTIFY_WINDOW_SEC = 60
+
+# Интервал обслуживания: удаление прошедших записей, очистка кеша,
+# проверка изменений в Google Sheets
+MAINTENANCE_INTERVAL_SEC = 60
+
+# Устанавливается при инвалидации кеша бронирований - куча пересобирается
+_bookings_changed = asyncio.Event()
+
+# Уже отправленные напоминания: (дата, время, ID пользователя)
+_notified: Set[Tuple[str, str, str]] = set()
+
 
 async def _send(bot: Bot, peer_id: int, message: str) -> None:
     try:
@@ -39,119 +58,161 @@ async def _notify_admins(bot: Bot, message: str) -> None:
         await _send(bot, admin_id, message)
 
 
-async def notification_loop(bot: Bot):
+def _notification_key(booking: BookingRecord) -> Tuple[str, str, str]:
+    return (booking["Дата"], booking["Время"], booking.get("Пользователь_ID", ""))
+
+
+async def _build_notification_heap() -> List[Tuple[float, int, BookingRecord]]:
     """
-    Асинхронный цикл уведомлений:
-    - За NOTIFY_BEFORE_MIN минут до начала стирки уведомляет пользователя и админов
-    - Через WASH_DURATION_MIN + NOTIFY_AFTER_MIN минут после начала уведомляет об окончании
+    Строит кучу напоминаний по подтвержденным записям.
+
+    Returns:
+        Куча кортежей (время отправки в секундах epoch, номер строки, запись)
     """
+    now = time.time()
+    notify_before = NOTIFY_BEFORE_MIN * 60
+
+    bookings = await get_bookings(statuses={STATUS_CONFIRMED})
+    heap: List[Tuple[float, int, BookingRecord]] = []
+    keys = set()
+    for booking in bookings:
+        try:
+            booking_start = datetime.strptime(
+                f"{booking['Дата']} {booking['Время']}", DATETIME_FORMAT
+            ).replace(tzinfo=MOSCOW_TZ)
+        except ValueError:
+            logger.warning("Неверный формат даты/времени в записи: %s", booking)
+            continue
+
+        notify_at = booking_start.timestamp() - notify_before
+        if notify_at + NOTIFY_WINDOW_SEC < now:
+            continue
+        key = _notification_key(booking)
+        keys.add(key)
+        if key in _notified:
+            continue
+        heap.append((notify_at, booking.get("_row", 0), booking))
+
+    # Забываем отправленные напоминания по записям, которых больше нет
+    _notified.intersection_update(keys)
+    heapq.heapify(heap)
+    return heap
+
+
+async def _notify_before(bot: Bot, booking: BookingRecord) -> None:
+    """Отправляет напоминание о скором начале стирки пользователю и админам."""
+    user_peer: Optional[int] = None
+    user_id_str = booking.get("Пользователь_ID")
+    if user_id_str:
+        try:
+            user_peer = int(user_id_str)
+        except (TypeError, ValueError):
+            logger.warning("Невалидный ID пользователя: %s", booking)
+
+    message_user = (
+        f"⚠️ Через {NOTIFY_BEFORE_MIN} минут начнётся ваша стирка.\n"
+        f"Дата: {booking['Дата']} {booking['Время']}\n"
+        f"Опции: {booking.get('Опция стирки') or 'Без добавок'}"
+    )
+    message_admin = (
+        f"⚠️ Стирка пользователя {booking['Пользователь']} "
+        f"начнётся через {NOTIFY_BEFORE_MIN} минут "
+        f"({booking['Дата']} {booking['Время']})."
+    )
+    if user_peer is not None:
+        await _send(bot, user_peer, message_user)
+    await _notify_admins(bot, message_admin)
+
+
+async def _reminder_loop(bot: Bot) -> None:
+    """
+    Цикл напоминаний за NOTIFY_BEFORE_MIN минут до начала стирки.
+    Спит до ближайшего напоминания в куче; при изменении бронирований
+    куча пересобирается из кеша.
+    """
+    heap: List[Tuple[float, int, BookingRecord]] = []
     while True:
-        offset = timedelta(hours=3)
-        moscow_tz = timezone(offset, name='МСК')
-        now = datetime.now(moscow_tz)
+        if _bookings_changed.is_set():
+            _bookings_changed.clear()
+            try:
+                heap = await _build_notification_heap()
+            except Exception as exc:
+                logger.warning("Не удалось построить расписание напоминаний: %s", exc)
 
-        today_bookings = await get_bookings(
-            date=now.date(),
-            statuses={STATUS_CONFIRMED},
-        )
+        if not heap:
+            await _bookings_changed.wait()
+            continue
 
-        for booking in today_bookings:
-            booking_time_str = f"{booking['Дата']} {booking['Время']}"
+        notify_at, _, booking = heap[0]
+        delay = notify_at - time.time()
+        if delay > 0:
             try:
-                booking_start = datetime.strptime(
-                    booking_time_str, DATETIME_FORMAT
-                )
-                booking_start = booking_start.replace(tzinfo=moscow_tz)
-            except ValueError:
-                logger.warning("Неверный формат даты/времени в записи: %s", booking)
-                continue
-
-            user_peer: Optional[int] = None
-            user_id_str = booking.get("Пользователь_ID")
-            if user_id_str:
-                try:
-                    user_peer = int(user_id_str)
-                except (TypeError, ValueError):
-                    logger.warning("Невалидный ID пользователя: %s", booking)
-
-            diff_before = (booking_start - now).total_seconds()
-            notify_before_target = NOTIFY_BEFORE_MIN * 60
-            notify_before_window_start = max(0, notify_before_target - 60)
-            if notify_before_window_start <= diff_before <= notify_before_target:
-                message_user = (
-                    f"⚠️ Через {NOTIFY_BEFORE_MIN} минут начнётся ваша стирка.\n"
-                    f"Дата: {booking['Дата']} {booking['Время']}\n"
-                    f"Опции: {booking.get('Опция стирки') or 'Без добавок'}"
-                )
-                message_admin = (
-                    f"⚠️ Стирка пользователя {booking['Пользователь']} "
-                    f"начнётся через {NOTIFY_BEFORE_MIN} минут "
-                    f"({booking['Дата']} {booking['Время']})."
-                )
-                if user_peer is not None:
-                    await _send(bot, user_peer, message_user)
-                await _notify_admins(bot, message_admin)
-
-            # notify_after_time = booking_start + timedelta(
-            #     minutes=WASH_DURATION_MIN + NOTIFY_AFTER_MIN
-            # )
-            # diff_after = (now - notify_after_time).total_seconds()
-            # if 0 <= diff_after < 60:
-            #     message_user = (
-            #         f"✅ Ваша стирка завершена.\n"
-            #         f"Дата: {booking['Дата']} {booking['Время']}"
-            #     )
-            #     message_admin = (
-            #         f"✅ Стирка пользователя {booking['Пользователь']} завершена "
-            #         f"({booking['Дата']} {booking['Время']})."
-            #     )
-            #     if user_peer is not None:
-            #         await _send(bot, user_peer, message_user)
-            #     await _notify_admins(bot, message_admin)
-                
-            #     # Удаляем запись после уведомления
-            #     try:
-            #         complete_booking(booking)
-            #     except Exception as exc:
-            #         logger.warning("Не удалось удалить завершенную запись %s: %s", booking, exc)
-        
-        # Удаляем прошедшие записи (которые уже прошли более чем на WASH_DURATION_MIN + NOTIFY_AFTER_MIN минут)
-        # Проверяем все подтвержденные записи, не только за сегодня
-        all_bookings = await get_bookings()
-        processed_today_ids = {booking.get("_row") for booking in today_bookings}
-        
-        for booking in all_bookings:
-            # Пропускаем записи за сегодня, они уже обработаны выше
-            if booking.get("_row") in processed_today_ids:
-                continue
-                
-            booking_time_str = f"{booking['Дата']} {booking['Время']}"
+                await asyncio.wait_for(_bookings_changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        heapq.heappop(heap)
+        if -delay > NOTIFY_WINDOW_SEC:
+            # Момент отправки давно прошел (например, бот был занят) - пропускаем
+            continue
+        _notified.add(_notification_key(booking))
+        await _notify_before(bot, booking)
+
+
+async def _remove_past_bookings(now: datetime) -> None:
+    """
+    Удаляет записи, которые прошли более чем на NOTIFY_AFTER_MIN минут.
+    Подтвержденные записи за сегодня не трогаем.
+
+    Args:
+        now: Текущее московское время
+    """
+    # Сегодняшние подтвержденные записи отбираются по дате и статусу, а не по
+    # номерам строк: каждое удаление сдвигает "_row" записей ниже него
+    today_str = now.date().strftime(DATE_FORMAT)
+    all_bookings = await get_bookings()
+
+    for booking in all_bookings:
+        if booking.get("Дата") == today_str and booking.get("Статус") == STATUS_CONFIRMED:
+            continue
+
+        booking_time_str = f"{booking['Дата']} {booking['Время']}"
+        try:
+            booking_start = datetime.strptime(
+                booking_time_str, DATETIME_FORMAT
+            )
+            booking_start = booking_start.replace(tzinfo=MOSCOW_TZ)
+        except ValueError:
+            continue
+
+        # Удаляем записи, которые прошли более чем на NOTIFY_AFTER_MIN минут
+        booking_end_time = booking_start + timedelta(
+            minutes=NOTIFY_AFTER_MIN
+        )
+        if now > booking_end_time:
             try:
-                booking_start = datetime.strptime(
-                    booking_time_str, "%d.%m.%y %H:%M"
+                await complete_booking(booking)
+                logger.info(
+                    "Автоматически удалена прошедшая запись: %s %s",
+                    booking['Дата'],
+                    booking['Время']
                 )
-                booking_start = booking_start.replace(tzinfo=moscow_tz)
-            except ValueError:
-                continue
-            
-            # Удаляем записи, которые прошли более чем на NOTIFY_AFTER_MIN минут
-            booking_end_time = booking_start + timedelta(
-                minutes=NOTIFY_AFTER_MIN
-            )
-            if now > booking_end_time:
-                try:
-                    await complete_booking(booking)
-                    logger.info(
-                        "Автоматически удалена прошедшая запись: %s %s",
-                        booking['Дата'],
-                        booking['Время']
-                    )
-                except Exception as exc:
-                    logger.warning(
-                        "Не удалось автоматически удалить прошедшую запись %s: %s",
-                        booking,
-                        exc
-                    )
+            except Exception as exc:
+                logger.warning(
+                    "Не удалось автоматически удалить прошедшую запись %s: %s",
+                    booking,
+                    exc
+                )
+
+
+async def _maintenance_loop() -> None:
+    """
+    Периодическое обслуживание: удаление прошедших записей,
+    очистка истекших записей кеша и проверка изменений в Google Sheets.
+    """
+    while True:
+        await _remove_past_bookings(datetime.now(MOSCOW_TZ))
 
         # Периодически очищаем истекшие записи из кеша
         cache = get_cache()
@@ -163,4 +224,17 @@ async def notification_loop(bot: Bot):
         except Exception as exc:
             logger.warning(f"Ошибка при проверке изменений в Google Sheets: {exc}")
 
-        await asyncio.sleep(60)
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SEC)
+
+
+async def notification_loop(bot: Bot):
+    """
+    Асинхронный цикл уведомлений:
+    - За NOTIFY_BEFORE_MIN минут до начала стирки уведомляет пользователя и админов
+    - Раз в MAINTENANCE_INTERVAL_SEC секунд удаляет прошедшие записи
+      и проверяет изменения в таблице
+    """
+    add_bookings_listener(_bookings_changed.set)
+    # Первичное построение кучи напоминаний
+    _bookings_changed.set()
+    await asyncio.gather(_reminder_loop(bot), _maintenance_loop())
@@ -0,0 +1,4 @@
+import os
+
+# config.py требует ADMIN_IDS при импорте
+os.environ.setdefault("ADMIN_IDS", "1")
@@ -0,0 +1,230 @@
+import asyncio
+import re
+import unittest
+from unittest import mock
+
+try:
+    import cache
+    import google_sheets
+except (ImportError, RuntimeError) as exc:  # зависимости бота не установлены
+    raise unittest.SkipTest(f"Модули бота недоступны: {exc}")
+
+
+class FakeSheet:
+    """Лист List в памяти: применяет запросы так же по порядку, как Sheets API."""
+
+    def __init__(self, rows):
+        self.rows = [list(google_sheets.BOOKING_HEADER)] + [list(row) for row in rows]
+
+    async def request(self, method, path, params=None, json=None):
+        if path == ":batchUpdate":
+            for item in json["requests"]:
+                rng = item["deleteDimension"]["range"]
+                del self.rows[rng["startIndex"]:rng["endIndex"]]
+        elif path == "/values:batchUpdate":
+            for item in json["data"]:
+                letters, row = re.fullmatch(r"List!([A-Z]+)(\d+)", item["range"]).groups()
+                col = google_sheets.BOOKING_HEADER.index(
+                    next(
+                        name
+                        for name, letter in google_sheets._BOOKING_COLUMNS.items()
+                        if letter == letters
+                    )
+                )
+                self.rows[int(row) - 1][col] = item["values"][0][0]
+        else:
+            raise AssertionError(f"Неожиданный запрос {method} {path}")
+        return {}
+
+    def users(self):
+        return [row[0] for row in self.rows[1:]]
+
+
+def _booking(row: int, user: str) -> dict:
+    record = dict.fromkeys(google_sheets.BOOKING_HEADER, "")
+    record.update(
+        {
+            "Пользователь": user,
+            "Дата": "10.03.25",
+            "Время": f"1{row}:00",
+            "Статус": google_sheets.STATUS_CONFIRMED,
+            "_row": row,
+        }
+    )
+    return record
+
+
+class WriteQueueRowsTest(unittest.TestCase):
+    def setUp(self):
+        cache.init_cache(300)
+        self.records = [_booking(row, user) for row, user in zip(range(2, 6), "ABCD")]
+        self.sheet = FakeSheet(
+            [google_sheets._values_from_record(record) for record in self.records]
+        )
+
+        async def init_ok():
+            return True
+
+        for patcher in (
+            mock.patch.object(google_sheets, "_init_google_sheets", init_ok),
+            mock.patch.object(google_sheets, "_request", self.sheet.request),
+            mock.patch.dict(google_sheets._sheet_ids, {google_sheets.LIST_SHEET_NAME: 0}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_batched_deletes_lower_row_first(self):
+        async def run():
+            loop = asyncio.get_running_loop()
+            ops = [
+                google_sheets._WriteOp("delete", google_sheets.LIST_SHEET_NAME, row, loop.create_future())
+                for row in (2, 4)
+            ]
+            await google_sheets._apply_writes(ops)
+
+        asyncio.run(run())
+        self.assertEqual(self.sheet.users(), ["B", "D"])
+
+    def test_concurrent_deletes_and_update_hit_intended_rows(self):
+        async def run():
+            google_sheets._write_queue = asyncio.Queue()
+            writer = asyncio.create_task(google_sheets._flush_writer())
+            cache.get_cache().set(
+                cache.CACHE_KEY_BOOKINGS, self.records, transform=cache._index_bookings
+            )
+            a, b, c, d = self.records
+            try:
+                results = await asyncio.gather(
+                    google_sheets.delete_booking(a),
+                    google_sheets.delete_booking(c),
+                    google_sheets.update_booking(d, {"Статус": google_sheets.STATUS_PENDING}),
+                )
+            finally:
+                writer.cancel()
+            return results
+
+        self.assertEqual(asyncio.run(run())[:2], [True, True])
+        self.assertEqual(self.sheet.users(), ["B", "D"])
+        status_col = google_sheets.BOOKING_HEADER.index("Статус")
+        self.assertEqual(self.sheet.rows[2][status_col], google_sheets.STATUS_PENDING)
+        remaining = cache.get_cache()._cache[cache.CACHE_KEY_BOOKINGS].data.all
+        self.assertEqual([(r["Пользователь"], r["_row"]) for r in remaining], [("B", 2), ("D", 3)])
+
+
+
+class RemoveBlacklistTest(unittest.TestCase):
+    def setUp(self):
+        cache.init_cache(300)
+        self.rows = [["Ссылка"], ["vk.com/a"], ["vk.com/b"]]
+
+        async def init_ok():
+            return True
+
+        async def load_blacklist():
+            return google_sheets._parse_blacklist(self.rows)
+
+        for patcher in (
+            mock.patch.object(google_sheets, "_init_google_sheets", init_ok),
+            mock.patch.object(google_sheets, "_load_blacklist", load_blacklist),
+            mock.patch.object(google_sheets, "_request", self.request),
+            mock.patch.dict(google_sheets._sheet_ids, {google_sheets.BLACKLIST_SHEET_NAME: 1}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def request(self, method, path, params=None, json=None):
+        if method == "GET":
+            row = int(re.fullmatch(r"/values/Blacklist!A(\d+)", path).group(1))
+            return {"values": [self.rows[row - 1]]} if row <= len(self.rows) else {}
+        if path == ":batchUpdate":
+            for item in json["requests"]:
+                rng = item["deleteDimension"]["range"]
+                del self.rows[rng["startIndex"]:rng["endIndex"]]
+            return {}
+        raise AssertionError(f"Неожиданный запрос {method} {path}")
+
+    def remove(self, link):
+        async def run():
+            google_sheets._write_queue = asyncio.Queue()
+            writer = asyncio.create_task(google_sheets._flush_writer())
+            try:
+                return await google_sheets.remove_blacklist(link)
+            finally:
+                writer.cancel()
+
+        return asyncio.run(run())
+
+    def test_stale_row_is_rechecked_before_delete(self):
+        cache.get_cache().set(cache.CACHE_KEY_BLACKLIST, {"vk.com/a": 2, "vk.com/b": 3})
+        # Строку добавили в лист вручную, номера в кеше сдвинулись
+        self.rows.insert(1, ["vk.com/new"])
+        self.assertTrue(self.remove("vk.com/b"))
+        self.assertEqual(self.rows, [["Ссылка"], ["vk.com/new"], ["vk.com/a"]])
+
+    def test_link_missing_from_sheet_deletes_nothing(self):
+        cache.get_cache().set(cache.CACHE_KEY_BLACKLIST, {"vk.com/a": 2, "vk.com/b": 3})
+        del self.rows[2]
+        self.assertFalse(self.remove("vk.com/b"))
+        self.assertEqual(self.rows, [["Ссылка"], ["vk.com/a"]])
+
+
+def _baseline_screen_name(url):
+    """Разбор ссылки в том виде, в каком он был до кеширования (эталон)."""
+    clean_url = url.strip().lower()
+    patterns = [
+        r'(?:https?://)?(?:m\.)?vk\.(?:ru|com)/([^/?&]+)',
+        r'^@([a-zA-Z0-9_.]+)$',
+        r'^([a-zA-Z0-9_.]+)$',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, clean_url)
+        if match:
+            screen_name = match.group(1)
+            if screen_name and not re.search(r'[^\w\.]', screen_name):
+                return screen_name
+    return None
+
+
+class ScreenNameTest(unittest.TestCase):
+    CASES = [
+        "https://vk.com/durov",
+        "http://vk.ru/durov",
+        "vk.com/id123",
+        "m.vk.com/durov",
+        "https://m.vk.ru/durov?w=wall1",
+        "https://vk.com/durov/photos",
+        "  HTTPS://VK.COM/Durov  ",
+        "@durov",
+        "durov",
+        "id123",
+        "some.name_1",
+        "привет",
+        "@привет",
+        "vk.com/привет",
+        "https://club.vk.com/durov",
+        "https://sub.domain.vk.com/durov",
+        "https://example.com/durov",
+        "vk.com/",
+        "@",
+        "",
+        "dur ov",
+        "durov!",
+        "https://vk.com/dur-ov",
+    ]
+
+    def test_matches_baseline(self):
+        for url in self.CASES:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    google_sheets.extract_screen_name_from_url(url),
+                    _baseline_screen_name(url),
+                )
+
+    def test_bare_and_mention_names_are_ascii_only(self):
+        self.assertIsNone(google_sheets.extract_screen_name_from_url("привет"))
+        self.assertIsNone(google_sheets.extract_screen_name_from_url("@привет"))
+        self.assertEqual(google_sheets.extract_screen_name_from_url("@durov"), "durov")
+
+
+if __name__ == "__main__":
+    unittest.main()
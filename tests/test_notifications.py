@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest import mock
+
+try:
+    import cache
+    import google_sheets
+    import notifications
+except (ImportError, RuntimeError) as exc:  # зависимости бота не установлены
+    raise unittest.SkipTest(f"Модули бота недоступны: {exc}")
+
+from config import MOSCOW_TZ
+
+
+def _booking(row: int, date: str, time_slot: str, status: str) -> dict:
+    record = dict.fromkeys(google_sheets.BOOKING_HEADER, "")
+    record.update({"Дата": date, "Время": time_slot, "Статус": status, "_row": row})
+    return record
+
+
+class RemovePastBookingsTest(unittest.TestCase):
+    def setUp(self):
+        cache.init_cache(300)
+
+        async def init_ok():
+            return True
+
+        patcher = mock.patch.object(google_sheets, "_init_google_sheets", init_ok)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_two_deletions_keep_todays_confirmed(self):
+        records = [
+            _booking(2, "09.03.25", "10:00", google_sheets.STATUS_CONFIRMED),
+            _booking(3, "09.03.25", "11:00", google_sheets.STATUS_CONFIRMED),
+            _booking(4, "10.03.25", "09:00", google_sheets.STATUS_CONFIRMED),
+            _booking(5, "11.03.25", "10:00", google_sheets.STATUS_PENDING),
+        ]
+        cache.get_cache().set(cache.CACHE_KEY_BOOKINGS, records, transform=cache._index_bookings)
+        deleted = []
+
+        async def fake_complete(record):
+            # Как delete_booking: строка удаляется, строки ниже сдвигаются
+            deleted.append((record["Дата"], record["Время"], record["_row"]))
+            await cache.apply_booking_delete(record["_row"])
+
+        now = datetime(2025, 3, 10, 15, 0, tzinfo=MOSCOW_TZ)
+        with mock.patch.object(notifications, "complete_booking", fake_complete):
+            asyncio.run(notifications._remove_past_bookings(now))
+
+        self.assertEqual(
+            deleted,
+            [("09.03.25", "10:00", 2), ("09.03.25", "11:00", 2)],
+        )
+        remaining = cache.get_cache()._cache[cache.CACHE_KEY_BOOKINGS].data.all
+        self.assertEqual(
+            [(r["Дата"], r["Время"], r["_row"]) for r in remaining],
+            [("10.03.25", "09:00", 2), ("11.03.25", "10:00", 3)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()